@@ -1,12 +1,16 @@
 
-from fastapi import FastAPI, HTTPException
+import time
+import asyncio
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Response
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.generate_offer_letter import generate_offer_letter
 from backend.fallback_jinja import generate_offer_letter_jinja
 from utils.load_employee_metadata import load_employee_metadata
-from backend.retriever import retrieve_relevant_chunks
+from backend.retriever import retrieve_relevant_chunks, aretrieve_relevant_chunks, result_cache
+from backend.embedding_cache import normalize_text
 
 
 # Initialize app
@@ -26,6 +30,32 @@ class OfferRequest(BaseModel):
     employee_name: str
     use_jinja: bool = False  # Optional: fallback option for non-GPT generation
 
+# Identical searches that arrive while one is running share its result (single flight);
+# finished results are served from the retriever's result cache. The shared search runs
+# in its own task, so a client that disconnects does not cancel it for the others.
+_inflight = {}
+SEARCH_MAX_TOP_K = 20
+SEARCH_CACHE_SECONDS = 60  # Cache-Control max-age for portal/browser caches
+
+def _search_done(key, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        # Waiters re-raise it; mark it retrieved so a search nobody awaits is not logged
+        task.exception()
+
+async def _coalesced_search(q: str, top_k: int, sources: Optional[List[str]]):
+    key = (normalize_text(q), top_k, tuple(sorted(sources)) if sources else None)
+    task = _inflight.get(key)
+    coalesced = task is not None
+    if task is None:
+        filters = {"source": sources} if sources else None
+        task = asyncio.create_task(aretrieve_relevant_chunks(q, top_k=top_k, filters=filters))
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _search_done(key, done))
+    # Cancelling this request cancels only its wait, never the shared search
+    return await asyncio.shield(task), coalesced
+
 # Root endpoint
 @app.get("/")
 def read_root():
@@ -50,7 +80,41 @@ def generate_offer(request: OfferRequest):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Offer letter generation failed: {str(e)}")
-    
+
+# Policy search endpoint, e.g. /policies/search?q=hotel cap&top_k=3&source=hr_travel_policy
+@app.get("/policies/search")
+async def search_policies(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Policy question or keywords"),
+    top_k: int = Query(5, ge=1, le=SEARCH_MAX_TOP_K),
+    source: Optional[List[str]] = Query(None, description="Restrict to these documents, e.g. hr_leave_policy (repeatable or comma-separated)"),
+):
+    if not q.strip():
+        raise HTTPException(status_code=422, detail="Query 'q' must not be blank.")
+    sources = [name.strip() for value in source or [] for name in value.split(",") if name.strip()] or None
+
+    start = time.perf_counter()
+    try:
+        chunks, shared = await _coalesced_search(q, top_k, sources)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Policy search failed: {str(e)}")
+
+    response.headers["Cache-Control"] = f"public, max-age={SEARCH_CACHE_SECONDS}"
+    return {
+        "query": q,
+        "top_k": top_k,
+        "source": sources,
+        "results": [{"rank": i, "text": text} for i, text in enumerate(chunks, 1)],
+        "shared": shared,  # answered by a concurrent identical request
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+@app.get("/policies/search/stats")
+def search_stats():
+    return {"result_cache": result_cache.stats(), "inflight": len(_inflight)}
+
 
 ##to run the code enter thos in the terminal
 # uvicorn api_server:app --reload
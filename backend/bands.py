@@ -0,0 +1,13 @@
+import re
+
+# Band levels as written in the policy PDFs: "L3", "Band L3", "L1 to L5", "L4-L6"
+BAND_RANGE_RE = re.compile(r'\bL([1-9])\s*(?:to|-|–)\s*L([1-9])\b')
+BAND_RE = re.compile(r'\bL([1-9])\b')
+
+
+def extract_bands(text):
+    """Band levels (L1–L9) a chunk mentions, including ranges like "L1 to L5"."""
+    bands = {int(b) for b in BAND_RE.findall(text)}
+    for start, end in BAND_RANGE_RE.findall(text):
+        bands.update(range(int(start), int(end) + 1))
+    return [f"L{b}" for b in sorted(bands)]
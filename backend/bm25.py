@@ -0,0 +1,75 @@
+import re
+import math
+from collections import Counter, defaultdict
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str):
+    """Lower-cased word tokens; band codes ("L3") and numbers ("4,000" -> "4", "000") survive intact."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring.
+    `documents` is a list of (doc_id, text, metadata) tuples; only the postings
+    of query terms are visited, so keyword lookups never touch the network.
+    """
+
+    def __init__(self, documents, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self.texts = []
+        self.metadata = []
+        self.doc_lengths = []
+        self.postings = defaultdict(list)  # term -> [(doc index, term frequency)]
+
+        for doc_id, text, metadata in documents:
+            index = len(self.doc_ids)
+            tokens = tokenize(text)
+            self.doc_ids.append(doc_id)
+            self.texts.append(text)
+            self.metadata.append(metadata)
+            self.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((index, tf))
+
+        n = len(self.doc_ids)
+        self.avg_length = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query: str, top_k: int = 5, predicate=None):
+        """
+        Returns (doc_id, score, text, metadata) tuples, best first.
+        `predicate(metadata)` optionally restricts the candidates.
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, tf in self.postings[term]:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[index] / (self.avg_length or 1.0)
+                scores[index] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+
+        if predicate is not None:
+            scores = {i: score for i, score in scores.items() if predicate(self.metadata[i])}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return [(self.doc_ids[i], score, self.texts[i], self.metadata[i]) for i, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """Merges ranked id lists; each id scores sum(1 / (k + rank)). Returns ids, best first."""
+    scores = defaultdict(float)
+    first_seen = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+            first_seen.setdefault(doc_id, len(first_seen))
+    return sorted(scores, key=lambda doc_id: (-scores[doc_id], first_seen[doc_id]))
@@ -0,0 +1,72 @@
+import os
+import re
+import time
+import logging
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+
+logger = logging.getLogger(__name__)
+
+# Reindexing builds "<alias>_v<epoch ms>" next to the live collection and then repoints
+# the alias (QDRANT_COLLECTION, "policy_chunks") in one atomic call, so searches see
+# either the old index or the new one, never a mix. Older versions beyond
+# KEEP_PREVIOUS_VERSIONS (kept for rollback) are deleted afterwards.
+KEEP_PREVIOUS_VERSIONS = int(os.getenv("KEEP_PREVIOUS_VERSIONS", "1"))
+
+
+def new_version_name(alias: str) -> str:
+    return f"{alias}_v{int(time.time() * 1000)}"
+
+
+def list_versions(client: QdrantClient, alias: str):
+    """Versioned collections of `alias`, oldest first."""
+    pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    names = [c.name for c in client.get_collections().collections if pattern.match(c.name)]
+    return sorted(names, key=lambda name: int(pattern.match(name).group(1)))
+
+
+def resolve_alias(client: QdrantClient, alias: str):
+    """
+    Collection that `alias` currently serves: the alias target, the collection itself
+    for a pre-alias (plain) collection of that name, or None if neither exists.
+    """
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    if alias in [c.name for c in client.get_collections().collections]:
+        return alias
+    return None
+
+
+def swap_alias(client: QdrantClient, alias: str, target: str):
+    """Points `alias` at `target` atomically; returns the collection it served before."""
+    previous = resolve_alias(client, alias)
+    operations = []
+    if previous == alias:
+        # First reindex after upgrading: a plain collection holds the alias name. It has to
+        # go before the alias can be created, so this one switch is not atomic.
+        logger.warning(f"⚠️ Replacing plain collection '{alias}' with an alias; searches fail until the alias exists")
+        client.delete_collection(alias)
+        previous = None
+    elif previous is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(f"🔀 Alias '{alias}' -> '{target}'" + (f" (was '{previous}')" if previous else ""))
+    return previous
+
+
+def garbage_collect(client: QdrantClient, alias: str, keep: int = KEEP_PREVIOUS_VERSIONS, previous: str = None):
+    """
+    Deletes versions of `alias` other than the live one and `keep` rollback copies:
+    `previous` (the collection swap_alias returned) first, then the newest others.
+    """
+    live = resolve_alias(client, alias)
+    older = [name for name in list_versions(client, alias) if name not in (live, previous)]
+    if previous is not None and previous != live and keep > 0:
+        keep -= 1
+    stale = older[:-keep] if keep > 0 else older
+    for name in stale:
+        client.delete_collection(name)
+        logger.info(f"🗑️ Deleted old collection version '{name}'")
+    return stale
@@ -0,0 +1,101 @@
+import os
+from dotenv import load_dotenv
+from qdrant_client.http.models import (
+    VectorParams, Distance, HnswConfigDiff, PayloadSchemaType,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, QuantizationSearchParams,
+)
+
+load_dotenv()
+
+# Collection layouts for upload_to_qdrant.create_collection, selected with QDRANT_PROFILE.
+# Quantized profiles search int8 copies held in RAM and rescore the oversampled
+# candidates against the float originals, which stay on disk (memory-mapped).
+COLLECTION_PROFILE = os.getenv("QDRANT_PROFILE", "default")
+
+PROFILES = {
+    # Everything in RAM as float32 (Qdrant defaults)
+    "default": {
+        "quantization": False,
+        "vectors_on_disk": False,
+        "payload_on_disk": False,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "hnsw_on_disk": False,
+        "oversampling": None,
+    },
+    # int8 vectors in RAM (~4x smaller), float originals and payloads on disk
+    "compact": {
+        "quantization": True,
+        "vectors_on_disk": True,
+        "payload_on_disk": True,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "hnsw_on_disk": False,
+        "oversampling": 2.0,
+    },
+    # As compact, plus a sparser graph that also lives on disk: many collections per box
+    "dense": {
+        "quantization": True,
+        "vectors_on_disk": True,
+        "payload_on_disk": True,
+        "hnsw_m": 8,
+        "hnsw_ef_construct": 64,
+        "hnsw_on_disk": True,
+        "oversampling": 3.0,
+    },
+}
+
+# Payload fields the retriever filters on; indexed in every profile
+PAYLOAD_INDEXES = {
+    "source": PayloadSchemaType.KEYWORD,
+    "section_title": PayloadSchemaType.KEYWORD,
+    "type": PayloadSchemaType.KEYWORD,
+    "bands": PayloadSchemaType.KEYWORD,
+}
+
+
+def get_profile(name: str = None) -> dict:
+    name = name or COLLECTION_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"❌ Unknown QDRANT_PROFILE '{name}'. Choose from: {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def collection_config(size: int, name: str = None) -> dict:
+    """Keyword arguments for QdrantClient.create_collection under profile `name`."""
+    profile = get_profile(name)
+    config = dict(
+        vectors_config=VectorParams(size=size, distance=Distance.COSINE, on_disk=profile["vectors_on_disk"]),
+        hnsw_config=HnswConfigDiff(
+            m=profile["hnsw_m"],
+            ef_construct=profile["hnsw_ef_construct"],
+            on_disk=profile["hnsw_on_disk"],
+        ),
+        on_disk_payload=profile["payload_on_disk"],
+    )
+    if profile["quantization"]:
+        config["quantization_config"] = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    return config
+
+
+def quantization_search_params(name: str = None):
+    """Rescoring settings for searches against a quantized profile (None when unquantized)."""
+    profile = get_profile(name)
+    if not profile["quantization"]:
+        return None
+    return QuantizationSearchParams(rescore=True, oversampling=profile["oversampling"])
+
+
+def estimate_memory_bytes(count: int, size: int, name: str = None) -> int:
+    """Rough resident size of the vector data and HNSW links of `count` points under a profile."""
+    profile = get_profile(name)
+    resident = 0
+    if not profile["vectors_on_disk"]:
+        resident += count * size * 4  # float32 originals
+    if profile["quantization"]:
+        resident += count * size  # int8 copies (always_ram)
+    if not profile["hnsw_on_disk"]:
+        resident += count * profile["hnsw_m"] * 2 * 4  # layer-0 links, 4-byte ids
+    return resident
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import uuid
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+from backend.collection_aliases import resolve_alias
+
+load_dotenv()
+
+# The ingest scripts run from data/ and the API from the repo root, and both read the same
+# data files (the ingest scripts also retrieve when they rebuild the context bundles), so
+# relative data paths from the environment go through repo_path, never the working directory.
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def repo_path(value) -> Path:
+    """`value` as a path, with relative paths resolved against the repo root."""
+    path = Path(value)
+    return path if path.is_absolute() else REPO_ROOT / path
+
+
+# The version of a Qdrant collection is the collection its alias serves (a reindex or snapshot
+# import creates a new one), so API processes on every host see the switch within
+# COLLECTION_VERSION_TTL seconds. In-place upserts keep the collection, so writers also bump a
+# token in VERSION_FILE, which only processes sharing that file see.
+VERSION_FILE = Path(os.getenv("COLLECTION_VERSION_FILE", REPO_ROOT / "data" / "collection_version.json"))
+VERSION_TTL = float(os.getenv("COLLECTION_VERSION_TTL", "5"))
+
+_lock = threading.Lock()
+_cached_mtime = None
+_cached_versions = {}
+_live_collections = {}
+
+
+def _read_versions() -> dict:
+    """Re-reads the version file only when its mtime changes (one stat per call)."""
+    global _cached_mtime, _cached_versions
+    try:
+        mtime = VERSION_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    with _lock:
+        if mtime != _cached_mtime:
+            try:
+                with open(VERSION_FILE, "r", encoding="utf-8") as f:
+                    _cached_versions = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                _cached_versions = {}
+            _cached_mtime = mtime
+        return _cached_versions
+
+
+def _live_collection(client, collection_name: str):
+    """resolve_alias, memoized for VERSION_TTL seconds so cache lookups don't query Qdrant each time."""
+    now = time.monotonic()
+    with _lock:
+        cached = _live_collections.get(collection_name)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+    live = resolve_alias(client, collection_name)
+    with _lock:
+        _live_collections[collection_name] = (now + VERSION_TTL, live)
+    return live
+
+
+def get_collection_version(client, collection_name: str) -> str:
+    """Current version token of a Qdrant collection: the collection it serves plus the local bump token."""
+    return f"{_live_collection(client, collection_name)}:{_read_versions().get(collection_name, '0')}"
+
+
+def bump_collection_version(collection_name: str) -> str:
+    """Assigns a fresh version token; call after every upsert so cached results are dropped."""
+    with _lock:
+        # The writer just changed what the alias serves (or its contents): don't wait for the memo
+        _live_collections.pop(collection_name, None)
+    versions = dict(_read_versions())
+    versions[collection_name] = uuid.uuid4().hex
+    VERSION_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = VERSION_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(versions, f, indent=2)
+    os.replace(tmp_path, VERSION_FILE)
+    return versions[collection_name]
+
+
+def get_folder_version(folder) -> str:
+    """Version token for a folder of embedding files, derived from file names, sizes and mtimes."""
+    entries = []
+    for path in sorted(Path(folder).glob("*")):
+        if path.is_file():
+            stat = path.stat()
+            entries.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "|".join(entries)))
@@ -0,0 +1,88 @@
+import os
+import logging
+import numpy as np
+from backend.bands import extract_bands
+from backend.tokens import count_tokens
+from backend.text_store import TABLE_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Retrieved chunks are filtered before they reach the prompt: weak matches are
+# dropped (never the best chunk, so the prompt always has context), near-duplicates
+# collapsed, table rows for other bands removed, and what remains is packed
+# best-first into a token budget.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.2"))  # search score (cosine to the query)
+CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.95"))  # cosine between chunks
+CHUNK_SEPARATOR = "\n\n"
+
+
+def is_table_chunk(text: str) -> bool:
+    return text.startswith(TABLE_PREFIX)
+
+
+def trim_table_rows(text: str, band: str) -> str:
+    """
+    Keeps the header row and the rows that apply to `band` (rows naming no band
+    are kept too). Tables without one-row-per-line structure are returned unchanged.
+    """
+    lines = text.split("\n")
+    if len(lines) <= 2:
+        return text
+    rows = [lines[0]] + [line for line in lines[1:] if not extract_bands(line) or band in extract_bands(line)]
+    return "\n".join(rows)
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def assemble_context(chunks, band: str = None, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                     min_score: float = CONTEXT_MIN_SCORE, dedupe_threshold: float = CONTEXT_DEDUPE_THRESHOLD):
+    """
+    Selects prompt context from retrieved `chunks` (retriever.scored_chunk records, best first).
+    Uses the search scores and stored vectors they carry, so nothing is embedded here; chunks
+    without them (BM25-only hits) skip the score check and are deduplicated by exact text.
+    Returns the kept chunk texts, in retrieval order, totalling at most `token_budget` tokens.
+    `min_score` only applies once a chunk has been kept: the best chunk that fits always is.
+    """
+    chunks = [chunk for chunk in chunks if chunk["text"].strip()]
+    if not chunks:
+        return []
+
+    selected, selected_texts, selected_vectors = [], set(), []
+    used = 0
+    dropped = {"score": 0, "duplicate": 0, "budget": 0}
+    for chunk in chunks:
+        text, score, vector = chunk["text"], chunk.get("score"), chunk.get("vector")
+        if selected and score is not None and score < min_score:
+            dropped["score"] += 1
+            continue
+        vector = _unit(vector) if vector is not None else None
+        if text in selected_texts or (
+            vector is not None and selected_vectors and float(np.max(np.stack(selected_vectors) @ vector)) >= dedupe_threshold
+        ):
+            dropped["duplicate"] += 1
+            continue
+
+        if band and is_table_chunk(text):
+            text = trim_table_rows(text, band)
+        tokens = count_tokens(text) + (count_tokens(CHUNK_SEPARATOR) if selected else 0)
+        if used + tokens > token_budget:
+            # A later, smaller chunk may still fit
+            dropped["budget"] += 1
+            continue
+
+        selected.append(text)
+        selected_texts.add(chunk["text"])
+        if vector is not None:
+            selected_vectors.append(vector)
+        used += tokens
+
+    logger.info(
+        f"🧩 Context: kept {len(selected)}/{len(chunks)} chunks, {used}/{token_budget} tokens "
+        f"(dropped {dropped['score']} low-score, {dropped['duplicate']} duplicate, {dropped['budget']} over budget)"
+    )
+    return selected
@@ -0,0 +1,143 @@
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from backend.collection_version import REPO_ROOT
+from backend import retriever
+
+logger = logging.getLogger(__name__)
+
+# Policy context depends only on band and team, never on the employee's name,
+# so it is computed once per (band, team) after ingestion and looked up per letter.
+# upload_to_qdrant.py and the ingestion pipeline rebuild it whenever they change the index.
+BUNDLES_FILE = Path(os.getenv("CONTEXT_BUNDLES_FILE", REPO_ROOT / "data" / "context_bundles.json"))
+EMPLOYEE_FILE = Path(os.getenv("EMPLOYEE_FILE", REPO_ROOT / "data" / "Employee_List.json"))
+BUNDLE_TOP_K = 5
+BUNDLE_FORMAT = 2  # 2: search scores and stored chunk vectors are kept for the context assembler
+
+_lock = threading.Lock()
+_bundles = None
+_bundles_mtime = None
+_warned_stale = False
+
+
+def bundle_query(band: str, team: str) -> str:
+    return f"Generate offer letter for a {band} employee in the {team} team with policies"
+
+
+def bundle_key(band: str, team: str) -> str:
+    return f"{band}|{team}"
+
+
+def build_bundles(employee_file: Path = EMPLOYEE_FILE, output_file: Path = BUNDLES_FILE) -> dict:
+    """
+    Retrieves the policy context for every (band, team) in the employee list with
+    one batched retrieval per band and writes it as a compact bundle file: each distinct
+    chunk (text and stored vector) is stored once and bundles refer to chunks by position,
+    next to the search score of each.
+    """
+    with open(employee_file, "r", encoding="utf-8") as f:
+        employees = json.load(f)
+
+    combos = sorted({(emp["Band"], emp["Department"]) for emp in employees})
+    backend, mode = retriever.RETRIEVER_BACKEND, retriever.RETRIEVAL_MODE
+    version = retriever.get_index_version(backend, mode)
+
+    results = []
+    for band in sorted({band for band, _ in combos}):
+        band_combos = [combo for combo in combos if combo[0] == band]
+        contexts = retriever.retrieve_scored_chunks_many(
+            [bundle_query(b, team) for b, team in band_combos],
+            top_k=BUNDLE_TOP_K,
+            filters={"band": band},
+        )
+        results.extend(zip(band_combos, contexts))
+
+    chunks, vectors, positions, bundles, scores = [], [], {}, {}, {}
+    for (band, team), context in results:
+        refs = []
+        for chunk in context:
+            if chunk["text"] not in positions:
+                positions[chunk["text"]] = len(chunks)
+                chunks.append(chunk["text"])
+                vectors.append(None if chunk["vector"] is None else [round(float(x), 6) for x in chunk["vector"]])
+            refs.append(positions[chunk["text"]])
+        bundles[bundle_key(band, team)] = refs
+        scores[bundle_key(band, team)] = [chunk["score"] for chunk in context]
+
+    data = {
+        "format": BUNDLE_FORMAT,
+        "backend": backend,
+        "mode": mode,
+        "index_version": version,
+        "top_k": BUNDLE_TOP_K,
+        "chunks": chunks,
+        "vectors": vectors,
+        "bundles": bundles,
+        "scores": scores,
+    }
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    logger.info(f"📦 Built {len(bundles)} context bundles from {len(chunks)} distinct chunks -> {output_file}")
+    return data
+
+
+def refresh_bundles():
+    """Rebuilds the bundles after ingestion; a failure only leaves letters on live retrieval."""
+    try:
+        return build_bundles()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not rebuild context bundles ({e}); letters use live retrieval until they are rebuilt.")
+        return None
+
+
+def _load_bundles():
+    """Loads the bundle file once, and again when it is rewritten."""
+    global _bundles, _bundles_mtime, _warned_stale
+    try:
+        mtime = BUNDLES_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _lock:
+        if mtime != _bundles_mtime:
+            with open(BUNDLES_FILE, "r", encoding="utf-8") as f:
+                _bundles = json.load(f)
+            _bundles_mtime = mtime
+            _warned_stale = False  # warn again if the rebuilt bundles go stale too
+        return _bundles
+
+
+def get_policy_context(band: str, team: str, top_k: int = BUNDLE_TOP_K):
+    """
+    Returns the policy chunks for a (band, team) from the precomputed bundles, as
+    retriever.scored_chunk records for context_assembler.assemble_context.
+    Falls back to live retrieval when there is no bundle or the index was
+    re-ingested after the bundles were built.
+    """
+    global _warned_stale
+    data = _load_bundles()
+    if data is not None and data.get("format") == BUNDLE_FORMAT and top_k <= data["top_k"]:
+        current = retriever.get_index_version(data["backend"], data["mode"])
+        refs = data["bundles"].get(bundle_key(band, team))
+        if current != data["index_version"]:
+            if not _warned_stale:
+                logger.warning("⚠️ Context bundles are stale (policies re-ingested); using live retrieval.")
+                _warned_stale = True
+        elif refs is not None:
+            scores = data["scores"][bundle_key(band, team)]
+            return [retriever.scored_chunk(data["chunks"][i], score, data["vectors"][i]) for i, score in zip(refs[:top_k], scores)]
+
+    return retriever.retrieve_scored_chunks(bundle_query(band, team), top_k=top_k, filters={"band": band})
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    build_bundles()
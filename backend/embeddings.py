@@ -0,0 +1,184 @@
+import os
+import re
+import asyncio
+import math
+import hashlib
+from collections import Counter
+from typing import List
+import numpy as np
+import openai
+
+EMBEDDING_DIM = 1536
+# Reduced sizes for EMBEDDING_DIMS. text-embedding-3 vectors are trained so that a
+# prefix is itself a usable embedding once renormalised.
+SUPPORTED_DIMS = (256, 512, EMBEDDING_DIM)
+
+
+class EmbeddingProvider:
+    """
+    Common interface for embedding backends. `name` identifies the provider
+    and model; it is stored with ingested chunks and used in cache keys so
+    vectors from different providers are never mixed.
+    """
+
+    name = "base"
+    dim = EMBEDDING_DIM
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Async embed; providers without a native async client run `embed` in a worker thread."""
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API; one request per `embed` call (list input)."""
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        if not openai.api_key:
+            openai.api_key = os.getenv("OPENAI_API_KEY")
+        if not openai.api_key:
+            raise ValueError(" OPENAI_API_KEY not found. Set it as an environment variable.")
+        self.model = model
+        self.name = f"openai:{model}"
+        self._async_client = None
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        response = openai.embeddings.create(model=self.model, input=list(texts))
+        return self._ordered(response, len(texts))
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self._async_client is None:
+            # Created on first use and reused, so its connection pool stays warm
+            self._async_client = openai.AsyncOpenAI(api_key=openai.api_key)
+        response = await self._async_client.embeddings.create(model=self.model, input=list(texts))
+        return self._ordered(response, len(texts))
+
+    @staticmethod
+    def _ordered(response, count: int) -> List[List[float]]:
+        embeddings = [None] * count
+        for item in response.data:
+            embeddings[item.index] = item.embedding
+        return embeddings
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic offline stand-in: sublinear term frequencies of unigrams and
+    bigrams, feature-hashed (signed) into `dim` buckets and L2-normalised.
+    No network, no corpus statistics, identical output on every machine.
+    """
+
+    TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing:{dim}"
+
+    def _features(self, text: str) -> Counter:
+        tokens = self.TOKEN_RE.findall(text.lower())
+        features = Counter(tokens)
+        features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return features
+
+    def embed_one(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in self._features(text).items():
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign * (1.0 + math.log(count))
+
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(text) for text in texts]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        # Pure CPU and fast; a thread hop would cost more than it saves
+        return self.embed(texts)
+
+
+class ReducedDimensionProvider(EmbeddingProvider):
+    """Wraps a provider and keeps the first `dims` components of each vector, L2-renormalised."""
+
+    def __init__(self, inner: EmbeddingProvider, dims: int):
+        self.inner = inner
+        self.dim = dims
+        self.name = reduced_name(inner.name, dims)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return reduce_dimensions(self.inner.embed(texts), self.dim).tolist()
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return reduce_dimensions(await self.inner.aembed(texts), self.dim).tolist()
+
+
+def reduce_dimensions(vectors, dims: int) -> np.ndarray:
+    """Truncates a (n, d) matrix to its first `dims` columns and renormalises each row."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.shape[-1] < dims:
+        raise ValueError(f"❌ Cannot reduce {matrix.shape[-1]}-dim vectors to {dims} dims")
+    matrix = matrix[..., :dims]
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def reduced_name(name: str, dims: int) -> str:
+    """Provider name for vectors reduced to `dims` (unchanged at full size)."""
+    return name if dims == EMBEDDING_DIM else f"{name}@{dims}"
+
+
+def get_embedding_dims() -> int:
+    """Configured vector size (EMBEDDING_DIMS env var, default 1536); sizes the collection too."""
+    dims = int(os.getenv("EMBEDDING_DIMS", EMBEDDING_DIM))
+    if dims not in SUPPORTED_DIMS:
+        raise ValueError(f"❌ Unsupported EMBEDDING_DIMS={dims}. Choose from: {', '.join(map(str, SUPPORTED_DIMS))}")
+    return dims
+
+
+PROVIDERS = {
+    "openai": OpenAIEmbeddingProvider,
+    "hashing": HashingEmbeddingProvider,
+}
+
+_provider = None
+
+def get_embedding_provider(name: str = None, dims: int = None) -> EmbeddingProvider:
+    """
+    Returns the configured provider (EMBEDDING_PROVIDER env var, default "openai"),
+    reduced to `dims` (EMBEDDING_DIMS env var) when that is below its native size.
+    The default provider is created once per process.
+    """
+    global _provider
+    default = name is None and dims is None
+    if default and _provider is not None:
+        return _provider
+
+    key = name or os.getenv("EMBEDDING_PROVIDER", "openai")
+    if key not in PROVIDERS:
+        raise ValueError(f"❌ Unknown embedding provider '{key}'. Choose from: {', '.join(PROVIDERS)}")
+
+    provider = PROVIDERS[key]()
+    dims = dims or get_embedding_dims()
+    if dims < provider.dim:
+        provider = ReducedDimensionProvider(provider, dims)
+    if default:
+        _provider = provider
+    return provider
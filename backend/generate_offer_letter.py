@@ -3,6 +3,8 @@ import openai
 from dotenv import load_dotenv
 from datetime import datetime
 from backend.retriever import retrieve_relevant_chunks
+from backend.context_bundles import get_policy_context
+from backend.context_assembler import assemble_context
 from utils.load_employee_metadata import load_employee_metadata
 from backend.fallback_jinja import generate_offer_letter_jinja  # 👈 fallback
 
@@ -26,7 +28,10 @@ def generate_offer_letter(emp_name: str) -> str:
         print("🔐 Key in use:", openai.api_key)
 
         emp = load_employee_metadata(emp_name)
-        chunks = retrieve_relevant_chunks(f"Generate offer letter for {emp_name} with policies", top_k=5)
+        # Policy context depends only on band and team: O(1) bundle lookup, live retrieval as fallback
+        chunks = get_policy_context(emp["band"], emp["team"], top_k=5)
+        # Drop weak/duplicate chunks and other bands' table rows; cap the context's token count
+        chunks = assemble_context(chunks, band=emp["band"])
         context = "\n\n".join(chunks)
         today = datetime.today().strftime("%B %d, %Y")
 
@@ -1,11 +1,20 @@
 import os
+import sys
 import json
+import html
 import logging
+import argparse
+import unicodedata
 from pathlib import Path
-from unstructured.partition.pdf import partition_pdf
-from unstructured.documents.elements import Title, Table
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pypdf import PdfReader
+from unstructured.documents.elements import Title, Table, NarrativeText, ListItem
 import re
 
+# Make the repo root importable when run as a script from data/
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from backend.bands import extract_bands
+
 # Setup logger
 logging.basicConfig(
     level=logging.INFO,
@@ -17,21 +26,228 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Input/output directories
-DATA_DIR = Path("data")
+# Input/output directories (run from data/); every *.pdf under PDF_DIR is chunked
+PDF_DIR = Path(os.getenv("PDF_DIR", "raw_pdfs"))
 CHUNKS_DIR = Path("docs_chunks")
-CHUNKS_DIR.mkdir(parents=True, exist_ok=True)
 
-DOCUMENTS = {
-    "hr_leave_policy": "HR Leave Policy.pdf",
-    "hr_travel_policy": "HR Travel Policy.pdf",
-    "sample_offer_letter": "HR Offer Letter.pdf"
+# Partitioning is CPU-bound: documents are spread over a process pool (1 = serial)
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", str(os.cpu_count() or 1)))
+
+# Document names that differ from the slug of the file name (keeps existing chunk ids stable)
+DOCUMENT_NAMES = {
+    "HR Offer Letter.pdf": "sample_offer_letter",
 }
 
+# Element extraction: "unstructured" (partition_pdf with table inference), "text" (the PDF's
+# own text layer via pypdf, several times faster) or "auto" (text for documents without
+# images, tables or image-only pages, unstructured otherwise)
+PDF_EXTRACTION = os.getenv("PDF_EXTRACTION", "auto")
+EXTRACTION_MODES = ("auto", "text", "unstructured")
+
+def parse_document_extraction(value: str) -> dict:
+    overrides = json.loads(value or "{}")
+    unknown = {name: mode for name, mode in overrides.items() if mode not in EXTRACTION_MODES}
+    if unknown:
+        raise ValueError(f"Unknown extraction mode(s) in DOCUMENT_EXTRACTION: {unknown}. Choose from: {', '.join(EXTRACTION_MODES)}")
+    return overrides
+
+# Per-document extraction overrides, keyed by file name or document name, e.g.
+# DOCUMENT_EXTRACTION='{"HR Travel Policy.pdf": "text"}'; --extraction-for NAME=MODE on the CLI
+DOCUMENT_EXTRACTION = parse_document_extraction(os.getenv("DOCUMENT_EXTRACTION"))
+
+def extraction_override(value: str):
+    """argparse type for --extraction-for NAME=MODE; returns (name, mode)."""
+    name, sep, mode = value.rpartition("=")
+    if not sep or not name or mode not in EXTRACTION_MODES:
+        raise argparse.ArgumentTypeError(f"expected NAME=MODE with MODE one of {', '.join(EXTRACTION_MODES)}, got '{value}'")
+    return name, mode
+
+def document_extraction(doc_name: str, file_path, extraction: str = None, overrides: dict = None):
+    """
+    Extraction mode requested for one document, most specific first: `overrides`
+    (--extraction-for), `extraction` (--extraction), DOCUMENT_EXTRACTION, PDF_EXTRACTION.
+    """
+    def lookup(table):
+        return table.get(Path(file_path).name) or table.get(doc_name)
+
+    mode = lookup(overrides or {}) or extraction or lookup(DOCUMENT_EXTRACTION) or PDF_EXTRACTION
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode '{mode}'. Choose from: {', '.join(EXTRACTION_MODES)}")
+    return mode
+
 def looks_like_section_title(text):
     """Heuristic to detect section titles."""
     return bool(re.match(r'^(\d+[\.\d+]*|[📘🧠🏢📄🛫🧱📋🏡])', text.strip()))
 
+BULLET_RE = re.compile(r'^[●•▪◦○■\-–*]\s+')
+NUMBERED_ITEM_RE = re.compile(r'^\d+\.\s{2,}')  # "1.  Log into the portal." (headings have one space)
+COLUMN_GAP_RE = re.compile(r' {3,}')  # layout-mode text separates table columns with runs of spaces
+
+def is_table_row(line):
+    stripped = line.strip()
+    return bool(stripped) and not BULLET_RE.match(stripped) and len(COLUMN_GAP_RE.split(stripped)) >= 2
+
+def layout_blocks(page_text):
+    """Groups a page's layout-mode lines into blocks separated by blank lines."""
+    blocks, current = [], []
+    for line in page_text.splitlines():
+        if line.strip():
+            current.append(line)
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+def is_table_block(block):
+    return sum(is_table_row(line) for line in block) * 2 >= len(block)
+
+def has_image_xobjects(resources, depth=0):
+    """True if a resource dictionary (or a form nested in it) holds an image; cheaper than page.images."""
+    xobjects = resources.get("/XObject") if resources else None
+    if not xobjects or depth > 3:
+        return False
+    for ref in xobjects.get_object().values():
+        xobject = ref.get_object()
+        if xobject.get("/Subtype") == "/Image":
+            return True
+        if xobject.get("/Subtype") == "/Form" and has_image_xobjects(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+def read_text_layer(file_path):
+    """Layout-mode text of every page, plus whether any page carries images."""
+    reader = PdfReader(str(file_path))
+    # Layout mode fails on pages without a content stream (blank pages); they read as empty
+    pages = [page.extract_text(extraction_mode="layout") if "/Contents" in page else "" for page in reader.pages]
+    has_images = any(has_image_xobjects(page.get("/Resources")) for page in reader.pages)
+    return pages, has_images
+
+def needs_unstructured(pages, has_images):
+    """Why a document needs the unstructured partitioner, or None if its text layer is enough."""
+    if has_images:
+        return "has images"
+    if any(not page.strip() for page in pages):
+        return "has pages without a text layer"
+    for page in pages:
+        table_rows = [line for block in layout_blocks(page) if is_table_block(block) for line in block]
+        if len(table_rows) >= 2:
+            return "has tables"
+    return None
+
+def table_element(rows):
+    """Table element whose text_as_html carries the rows, for table_text()."""
+    cells = [COLUMN_GAP_RE.split(row.strip()) for row in rows]
+    element = Table(text=" ".join(" ".join(row) for row in cells))
+    element.metadata.text_as_html = "<table>" + "".join(
+        "<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>" for row in cells
+    ) + "</table>"
+    return element
+
+def is_heading(text):
+    """Numbered or emoji-prefixed short line without closing punctuation ("🧾 4. Leave Application Process")."""
+    words = text.split()
+    if len(words) > 15 or text.endswith((".", ":")):
+        return False
+    emoji_prefixed = unicodedata.category(text[0]) == "So" and len(words) >= 3
+    return looks_like_section_title(text) or emoji_prefixed
+
+def text_layer_elements(pages):
+    """
+    Elements for chunk_elements() from layout-mode page text: paragraphs, list items,
+    headings and column-aligned tables, the same element types partition_pdf produces.
+    The document's first paragraph is taken as its title when it is short.
+    """
+    elements = []
+
+    def flush(paragraph):
+        if not paragraph:
+            return
+        text = " ".join(paragraph)
+        first = not elements
+        short = len(text.split()) <= 15 and not text.endswith((".", ":"))
+        elements.append(Title(text=text) if first and short else NarrativeText(text=text))
+        paragraph.clear()
+
+    for page in pages:
+        table_rows = []
+        for block in layout_blocks(page):
+            if is_table_block(block):
+                table_rows.extend(block)
+                continue
+            if table_rows:
+                elements.append(table_element(table_rows))
+                table_rows = []
+
+            paragraph = []
+            for line in block:
+                line = line.strip()
+                if BULLET_RE.match(line):
+                    flush(paragraph)
+                    elements.append(ListItem(text=BULLET_RE.sub("", line)))
+                elif NUMBERED_ITEM_RE.match(line):
+                    flush(paragraph)
+                    elements.append(ListItem(text=" ".join(line.split())))
+                elif is_heading(line):
+                    flush(paragraph)
+                    elements.append(Title(text=line))
+                elif not paragraph and elements and isinstance(elements[-1], ListItem) and line[:1].islower():
+                    # Wrapped continuation of a list item
+                    elements[-1].text = f"{elements[-1].text} {line}"
+                else:
+                    paragraph.append(line)
+            flush(paragraph)
+        if table_rows:
+            elements.append(table_element(table_rows))
+    return elements
+
+def partition_with_unstructured(file_path):
+    # Imported here: partition_pdf pulls in the whole PDF/OCR stack, which the text path never needs
+    from unstructured.partition.pdf import partition_pdf
+    return partition_pdf(
+        filename=str(file_path),
+        extract_images_in_pdf=True,
+        infer_table_structure=True,
+        strategy="fast"
+    )
+
+def extract_elements(file_path, mode: str):
+    """Returns (elements, mode actually used) for one PDF; `mode` comes from document_extraction."""
+    if mode != "unstructured":
+        try:
+            pages, has_images = read_text_layer(file_path)
+        except Exception as e:
+            if mode == "text":
+                raise
+            logger.warning(f"pypdf could not read {file_path} ({e}); using unstructured")
+        else:
+            reason = needs_unstructured(pages, has_images) if mode == "auto" else None
+            if reason is None:
+                return text_layer_elements(pages), "text"
+            logger.info(f"{Path(file_path).name} {reason}; using unstructured")
+    return partition_with_unstructured(file_path), "unstructured"
+
+TABLE_ROW_RE = re.compile(r'<tr[^>]*>(.*?)</tr>', re.S | re.I)
+TABLE_CELL_RE = re.compile(r'<t[dh][^>]*>(.*?)</t[dh]>', re.S | re.I)
+TAG_RE = re.compile(r'<[^>]+>')
+
+def table_text(element):
+    """
+    Table text with one row per line ("cell | cell"), so the prompt assembler can keep
+    only the rows for an employee's band. Falls back to the flat text when the
+    partitioner did not infer the table structure.
+    """
+    html = getattr(element.metadata, "text_as_html", None)
+    if not html:
+        return element.text.strip()
+    rows = []
+    for row in TABLE_ROW_RE.findall(html):
+        cells = [" ".join(TAG_RE.sub(" ", cell).split()) for cell in TABLE_CELL_RE.findall(row)]
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return "\n".join(rows) or element.text.strip()
+
 def chunk_elements(elements):
     """
     Chunk elements into structured sections using Titles and Tables.
@@ -75,7 +291,7 @@ def chunk_elements(elements):
                 chunks.append({
                     "section_title": current_section_title or f"Table Section (Page {element.metadata.get('page_number', '?')})",
                     "type": "table",
-                    "text": element.text.strip()
+                    "text": table_text(element)
                 })
 
         else:
@@ -91,8 +307,60 @@ def chunk_elements(elements):
 
     return chunks
 
-def chunk_document(doc_name: str, filename: str):
-    file_path = DATA_DIR / filename
+def document_name(path: Path) -> str:
+    """Chunk-id prefix for a PDF: "HR Leave Policy.pdf" -> "hr_leave_policy"."""
+    if path.name in DOCUMENT_NAMES:
+        return DOCUMENT_NAMES[path.name]
+    return re.sub(r'[^a-z0-9]+', '_', path.stem.lower()).strip('_')
+
+def discover_documents(pdf_dir: Path = PDF_DIR):
+    """{document name: path} for every PDF under `pdf_dir`, in a stable order."""
+    documents = {}
+    for path in sorted(pdf_dir.rglob("*.pdf"), key=lambda p: str(p).lower()):
+        name = document_name(path)
+        if name in documents:
+            logger.warning(f"Skipping {path}: document name '{name}' already used by {documents[name]}")
+            continue
+        documents[name] = path
+    return documents
+
+def build_chunks(doc_name: str, file_path: Path, extraction: str = None, overrides: dict = None):
+    """
+    Partitions one PDF and returns its chunk records (runs in a worker process in parallel mode).
+    `extraction` and per-document `overrides` take precedence over DOCUMENT_EXTRACTION /
+    PDF_EXTRACTION (see document_extraction).
+    """
+    elements, used = extract_elements(file_path, document_extraction(doc_name, file_path, extraction, overrides))
+    logger.info(f"Extracted {len(elements)} elements from {Path(file_path).name} ({used})")
+
+    raw_chunks = chunk_elements(elements)
+
+    chunk_data = []
+    for i, chunk in enumerate(raw_chunks):
+        chunk_data.append({
+            "id": f"{doc_name}_chunk_{i+1}",
+            "text": chunk["text"],
+            "metadata": {
+                "source": doc_name,
+                "chunk_index": i,
+                "section_title": chunk["section_title"],
+                "type": chunk["type"],
+                "bands": extract_bands(chunk["text"])
+            }
+        })
+    return chunk_data
+
+def write_chunks(doc_name: str, chunk_data):
+    CHUNKS_DIR.mkdir(parents=True, exist_ok=True)
+    output_file = CHUNKS_DIR / f"{doc_name}_chunks.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(chunk_data, f, indent=2, ensure_ascii=False)
+
+    logger.info(f"✅ Created {len(chunk_data)} chunks for {doc_name}, saved to {output_file}")
+    return output_file
+
+def chunk_document(doc_name: str, file_path: Path, extraction: str = None, overrides: dict = None):
+    file_path = Path(file_path)
     if not file_path.exists():
         logger.warning(f"File not found: {file_path}")
         return
@@ -101,41 +369,47 @@ def chunk_document(doc_name: str, filename: str):
     logger.info("=" * 60)
 
     try:
-        elements = partition_pdf(
-            filename=str(file_path),
-            extract_images_in_pdf=True,
-            infer_table_structure=True,
-            strategy="fast"
-        )
-
-        raw_chunks = chunk_elements(elements)
-
-        chunk_data = []
-        for i, chunk in enumerate(raw_chunks):
-            chunk_data.append({
-                "id": f"{doc_name}_chunk_{i+1}",
-                "text": chunk["text"],
-                "metadata": {
-                    "source": doc_name,
-                    "chunk_index": i,
-                    "section_title": chunk["section_title"],
-                    "type": chunk["type"]
-                }
-            })
-
-        output_file = CHUNKS_DIR / f"{doc_name}_chunks.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(chunk_data, f, indent=2, ensure_ascii=False)
-
-        logger.info(f"✅ Created {len(chunk_data)} chunks for {doc_name}, saved to {output_file}")
-
+        return write_chunks(doc_name, build_chunks(doc_name, file_path, extraction, overrides))
     except Exception as e:
         logger.error(f"❌ Error processing {doc_name}: {str(e)}")
 
-def main():
-    for doc_name, filename in DOCUMENTS.items():
-        chunk_document(doc_name, filename)
+def chunk_documents_parallel(documents, workers: int, extraction: str = None, overrides: dict = None):
+    """
+    Partitions documents in `workers` processes. Workers only return chunk records;
+    files are written here, so the output is identical to the serial path.
+    """
+    written = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(build_chunks, doc_name, path, extraction, overrides): doc_name for doc_name, path in documents.items()}
+        logger.info(f"Partitioning {len(futures)} documents with {workers} worker processes")
+        for future in as_completed(futures):
+            doc_name = futures[future]
+            try:
+                written.append(write_chunks(doc_name, future.result()))
+            except Exception as e:
+                logger.error(f"❌ Error processing {doc_name}: {str(e)}")
+    return written
+
+def main(pdf_dir: Path = PDF_DIR, workers: int = CHUNK_WORKERS, extraction: str = None, overrides: dict = None):
+    documents = discover_documents(pdf_dir)
+    if not documents:
+        logger.warning(f"No PDFs found in {pdf_dir}")
+        return []
+
+    workers = max(1, min(workers, len(documents)))
+    if workers == 1:
+        return [path for path in (chunk_document(doc_name, path, extraction, overrides) for doc_name, path in documents.items()) if path]
+    return chunk_documents_parallel(documents, workers, extraction, overrides)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Chunk every policy PDF in a directory into docs_chunks/.")
+    parser.add_argument("--pdf-dir", type=Path, default=PDF_DIR)
+    parser.add_argument("--workers", type=int, default=CHUNK_WORKERS, help="worker processes (1 = serial)")
+    parser.add_argument("--extraction", choices=EXTRACTION_MODES, default=None,
+                        help="element extraction for every document (default: PDF_EXTRACTION / DOCUMENT_EXTRACTION)")
+    parser.add_argument("--extraction-for", type=extraction_override, action="append", default=[], metavar="NAME=MODE",
+                        help="extraction for one document, by file or document name (repeatable)")
+    args = parser.parse_args()
+
+    main(args.pdf_dir, args.workers, args.extraction, dict(args.extraction_for))
     logger.info("✅ All documents processed successfully.")
@@ -1,13 +1,26 @@
 import os
+import sys
 import json
+import time
+import asyncio
+import hashlib
 import logging
 from pathlib import Path
 from typing import List, Dict
+import numpy as np
 import openai
 from tqdm import tqdm
 from dotenv import load_dotenv
 load_dotenv()
 
+# Make the repo root importable when run as a script from data/
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from backend.embeddings import get_embedding_provider
+from backend.vector_store import save_vectors, load_document, remove_vectors
+from backend.rate_limit import TokenBucket, backoff_delay
+from backend.tokens import count_tokens
+from backend.text_store import chunk_text
+
 
 # --- Setup Logging ---
 logging.basicConfig(
@@ -20,78 +33,257 @@ logger = logging.getLogger(__name__)
 # --- Constants ---
 CHUNKS_DIR = Path("docs_chunks")  
 EMBEDDINGS_DIR = Path("embeddings") #create embeddings folder before hand
-EMBEDDING_MODEL = "text-embedding-3-small"
+# Content hash of every embedded chunk, per document; lets reruns reuse unchanged vectors.
+# Kept next to (not inside) embeddings/, where every *.json is read as an embedding file.
+MANIFEST_FILE = Path("ingest_manifest.json")
 
 # --- Ensure directory exists ---
 EMBEDDINGS_DIR.mkdir(parents=True, exist_ok=True)
 
-# --- Load OpenAI Key ---
-openai.api_key = os.getenv("OPENAI_API_KEY")  # safer to use env var
+# --- Embedding provider (EMBEDDING_PROVIDER=openai|hashing); must match the retriever's ---
+provider = get_embedding_provider()
 
-if not openai.api_key:
-    raise ValueError(" OPENAI_API_KEY not found. Set it as an environment variable.")
+# --- Batching, concurrency and rate limits (defaults sit under OpenAI tier-1 limits) ---
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))            # inputs per embeddings call
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "100000"))    # input tokens per call
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))           # batches in flight
+EMBED_RPM = float(os.getenv("EMBED_RPM", "3000"))                      # requests per minute (0 = unlimited)
+EMBED_TPM = float(os.getenv("EMBED_TPM", "1000000"))                   # tokens per minute (0 = unlimited)
+EMBED_MAX_ATTEMPTS = int(os.getenv("EMBED_MAX_ATTEMPTS", "5"))
 
 # --- Load Chunked JSON ---
 def load_chunks_from_file(filepath: Path) -> List[Dict]:
     with open(filepath, "r", encoding="utf-8") as f:
         return json.load(f)
 
-# --- Embed text using OpenAI ---
-def get_embedding(text: str) -> List[float]:
+# --- Chunks to embed for one document ---
+def chunk_item(chunk: Dict, source_file: str):
+    """Embedding work item for one chunk record, or None for an empty chunk."""
+    text = chunk_text(chunk)
+    if not text.strip():
+        return None
+
+    digest = content_hash(text)
+    return {
+        "id": chunk.get("id"),
+        "text": text,
+        "hash": digest,
+        "tokens": count_tokens(text),
+        "metadata": {
+            **chunk.get("metadata", {}),
+            "source_file": source_file,  # add this line
+            "embedding_provider": provider.name,
+            "content_hash": digest
+        }
+    }
+
+def prepare_chunks(json_file: Path) -> List[Dict]:
+    items = [chunk_item(chunk, json_file.name) for chunk in load_chunks_from_file(json_file)]
+    return [item for item in items if item is not None]
+
+# --- Incremental ingestion: content hashes + manifest ---
+def content_hash(text: str) -> str:
+    """SHA-256 of the exact text sent to the embeddings API."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def document_fingerprint(items: List[Dict]) -> str:
+    """Changes when any chunk id, text or metadata of a document changes."""
+    rows = [[item["id"], item["hash"], item["metadata"]] for item in items]
+    return hashlib.sha256(json.dumps(rows, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def load_manifest() -> Dict:
     try:
-        response = openai.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        logger.error(f"Error embedding text: {e}")
-        return []
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"provider": None, "documents": {}}
 
-# --- Main embedding logic ---
-def embed_all_documents():
-    json_files = list(CHUNKS_DIR.glob("*.json"))
-    logger.info(f" Found {len(json_files)} documents in {CHUNKS_DIR}")
+def save_manifest(documents: Dict):
+    tmp_path = MANIFEST_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"provider": provider.name, "documents": documents}, f, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
 
-    for json_file in tqdm(json_files, desc="Embedding documents"):
-        logger.info(f" Processing: {json_file.name}")
+def load_stored_vectors(manifest: Dict) -> Dict[str, np.ndarray]:
+    """content hash -> vector, from the embedding files of the previous run (same provider only)."""
+    if manifest.get("provider") != provider.name:
+        if manifest.get("provider"):
+            logger.info(f" Provider changed ({manifest['provider']} -> {provider.name}); re-embedding everything")
+        return {}
 
-        chunks = load_chunks_from_file(json_file)
-        embedded_chunks = []
+    stored = {}
+    for stem in manifest["documents"]:
+        if not (EMBEDDINGS_DIR / f"{stem}.npy").exists():
+            continue
+        ids, matrix, records = load_document(EMBEDDINGS_DIR, stem)
+        for row, record in enumerate(records):
+            digest = record.get("metadata", {}).get("content_hash") or content_hash(record.get("text", ""))
+            stored.setdefault(digest, np.asarray(matrix[row], dtype=np.float32))
+    return stored
 
-        for chunk in chunks:
-            text = chunk.get("text", "")
-            if not text.strip():
-                continue
+def document_unchanged(stem: str, fingerprint: str, manifest: Dict) -> bool:
+    entry = manifest["documents"].get(stem)
+    return (
+        manifest.get("provider") == provider.name
+        and entry is not None
+        and entry.get("fingerprint") == fingerprint
+        and (EMBEDDINGS_DIR / f"{stem}.npy").exists()
+    )
+
+def make_batches(items: List[Dict]) -> List[List[Dict]]:
+    """Groups items into calls of at most EMBED_BATCH_SIZE inputs and EMBED_BATCH_TOKENS tokens."""
+    batches, current, tokens = [], [], 0
+    for item in items:
+        if current and (len(current) >= EMBED_BATCH_SIZE or tokens + item["tokens"] > EMBED_BATCH_TOKENS):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(item)
+        tokens += item["tokens"]
+    if current:
+        batches.append(current)
+    return batches
+
+def is_valid_embedding(vector) -> bool:
+    return vector is not None and len(vector) > 0 and bool(np.isfinite(vector).all())
+
+class EmbeddingRunner:
+    """Embeds batches concurrently under request/token buckets, retrying only the items that failed."""
 
-            chunk_type = chunk.get("metadata", {}).get("type", "text")
-            if chunk_type == "table":
-                text = f"Table data: {text}"  # Or run a table summarization step
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+        self.requests = TokenBucket(EMBED_RPM / 60, capacity=max(EMBED_CONCURRENCY, 1))
+        self.tokens = TokenBucket(EMBED_TPM / 60, capacity=EMBED_TPM / 60 * 10)
+        self.calls = 0
+        self.retries = 0
 
-            embedding = get_embedding(text)
-            if not embedding:
+    async def _call(self, batch: List[Dict]):
+        await self.requests.acquire()
+        await self.tokens.acquire(sum(item["tokens"] for item in batch))
+        async with self.semaphore:
+            self.calls += 1
+            return await provider.aembed([item["text"] for item in batch])
+
+    async def embed_batch(self, batch: List[Dict]) -> List[Dict]:
+        """Sets item["embedding"] on success; returns the items that still failed after all attempts."""
+        pending = batch
+        for attempt in range(EMBED_MAX_ATTEMPTS):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt))
+            try:
+                vectors = await self._call(pending)
+            except openai.BadRequestError as e:
+                # The request itself is rejected (e.g. one oversized input): isolate the bad items
+                if len(pending) == 1:
+                    logger.error(f"Embedding rejected for {pending[0]['id']}: {e}")
+                    return pending
+                middle = len(pending) // 2
+                halves = await asyncio.gather(self.embed_batch(pending[:middle]), self.embed_batch(pending[middle:]))
+                return halves[0] + halves[1]
+            except Exception as e:
+                logger.warning(f"Embedding call for {len(pending)} chunks failed (attempt {attempt + 1}/{EMBED_MAX_ATTEMPTS}): {e}")
                 continue
 
-            embedded_chunks.append({
-                "id": chunk.get("id"),
-                "text": text,
-                "embedding": embedding,
-                "metadata": {
-                    **chunk.get("metadata", {}),
-                    "source_file": json_file.name  # add this line
-                }
-            })
+            failed = []
+            for item, vector in zip(pending, vectors):
+                if is_valid_embedding(vector):
+                    item["embedding"] = vector
+                else:
+                    failed.append(item)
+            if not failed:
+                return []
+            logger.warning(f"{len(failed)}/{len(pending)} embeddings invalid (attempt {attempt + 1}/{EMBED_MAX_ATTEMPTS}); re-sending only those")
+            pending = failed
+        return pending
+
+    async def run(self, items: List[Dict]) -> List[Dict]:
+        batches = make_batches(items)
+        failed = []
+        with tqdm(total=len(items), desc="Embedding chunks") as progress:
+            async def run_batch(batch):
+                failed.extend(await self.embed_batch(batch))
+                progress.update(len(batch))
+            await asyncio.gather(*(run_batch(batch) for batch in batches))
+        logger.info(f" {len(items)} chunks in {len(batches)} batches, {self.calls} calls, {self.retries} retries")
+        return failed
+
+# --- Main embedding logic ---
+def embed_all_documents():
+    json_files = sorted(CHUNKS_DIR.glob("*.json"))
+    logger.info(f" Found {len(json_files)} documents in {CHUNKS_DIR}")
+    logger.info(f" Embedding provider: {provider.name}")
+
+    manifest = load_manifest()
+    documents = {json_file.stem: prepare_chunks(json_file) for json_file in json_files}
+    fingerprints = {stem: document_fingerprint(items) for stem, items in documents.items()}
+    changed = {stem: items for stem, items in documents.items() if not document_unchanged(stem, fingerprints[stem], manifest)}
 
+    # Reuse stored vectors by content hash; embed each remaining distinct text once
+    stored = load_stored_vectors(manifest) if changed else {}
+    to_embed, reused, duplicates = {}, 0, 0
+    for items in changed.values():
+        for item in items:
+            if item["hash"] in stored:
+                item["embedding"] = stored[item["hash"]]
+                reused += 1
+            elif item["hash"] in to_embed:
+                duplicates += 1
+            else:
+                to_embed[item["hash"]] = item
 
-        # Save to embeddings folder
-        output_file = EMBEDDINGS_DIR / json_file.name
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(embedded_chunks, f, indent=2)
+    start = time.perf_counter()
+    failed = asyncio.run(EmbeddingRunner().run(list(to_embed.values()))) if to_embed else []
+    for items in changed.values():
+        for item in items:
+            if "embedding" not in item and "embedding" in to_embed.get(item["hash"], {}):
+                item["embedding"] = to_embed[item["hash"]]["embedding"]
+    missing = [item for items in changed.values() for item in items if "embedding" not in item]
 
+    entries = {}
+    for stem, items in documents.items():
+        if stem not in changed:
+            entries[stem] = manifest["documents"][stem]
+            continue
+
+        embedded_chunks = [item for item in items if "embedding" in item]
+        if not embedded_chunks:
+            logger.warning(f" No embeddings produced for {stem}, skipping.")
+            continue
+
+        # Save to embeddings folder as <name>.npy + <name>.meta.jsonl
+        output_file = save_vectors(
+            EMBEDDINGS_DIR,
+            stem,
+            ids=[c["id"] for c in embedded_chunks],
+            vectors=[c["embedding"] for c in embedded_chunks],
+            records=[{"text": c["text"], "metadata": c["metadata"]} for c in embedded_chunks],
+        )
         logger.info(f" Saved embeddings to {output_file}")
+        # A partially embedded document gets no fingerprint, so the next run retries it
+        entries[stem] = {
+            "fingerprint": fingerprints[stem] if len(embedded_chunks) == len(items) else None,
+            "chunks": {c["id"]: c["hash"] for c in embedded_chunks},
+        }
 
-if __name__ == "__main__":
-    embed_all_documents()
+    # Drop the embeddings of documents whose chunk files were removed
+    for stem in set(manifest["documents"]) - set(documents):
+        remove_vectors(EMBEDDINGS_DIR, stem)
+        logger.info(f" Removed embeddings of deleted document {stem}")
+
+    save_manifest(entries)
 
+    total = sum(len(items) for items in documents.values())
+    unchanged = sum(len(items) for stem, items in documents.items() if stem not in changed)
+    fresh = len(to_embed) - len(failed)
+    logger.info(
+        f" Summary: {total} chunks in {len(documents)} documents ({len(documents) - len(changed)} unchanged) — "
+        f"{unchanged + reused} reused, {fresh} freshly embedded, {duplicates} duplicate texts embedded once, "
+        f"{len(missing)} failed ({time.perf_counter() - start:.1f}s)"
+    )
+    if missing:
+        logger.error(f" {len(missing)} chunks could not be embedded and are left out: {', '.join(str(item['id']) for item in missing)}")
 
+    return missing
 
+if __name__ == "__main__":
+    sys.exit(1 if embed_all_documents() else 0)
@@ -0,0 +1,376 @@
+import os
+import sys
+import json
+import uuid
+import asyncio
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from qdrant_client.http.models import PointStruct, PointIdsList
+
+# Make the repo root importable when run as a script from data/
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from backend.collection_version import bump_collection_version
+from backend.collection_aliases import new_version_name, resolve_alias
+from backend.context_bundles import refresh_bundles
+from backend.vector_store import save_vectors, remove_vectors
+from backend.ingest.chunks import (
+    PDF_DIR, CHUNKS_DIR, CHUNK_WORKERS, EXTRACTION_MODES, discover_documents, build_chunks, write_chunks, extraction_override
+)
+from backend.ingest.create_embeddings import EmbeddingRunner, chunk_item, provider, EMBED_BATCH_SIZE, EMBED_CONCURRENCY
+from backend.text_store import PAYLOAD_TEXT, TEXT_STORE_DIR, TextStoreWriter, stored_payload
+from backend.ingest.upload_to_qdrant import (
+    client, create_collection, ensure_live_collection, publish_version, COLLECTION_NAME, UPSERT_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# One pass from PDF to searchable: partition (process pool) -> embed (batched, concurrent)
+# -> upsert, connected by bounded queues so a slow stage holds back the ones before it
+# instead of piling chunks up in memory. Run from data/, like the other ingest scripts:
+#   python ../backend/ingest/pipeline.py [--workers 8] [--write-intermediates] [--restart] [--reindex]
+# By default points are upserted into the collection the alias serves, so searches can
+# see a mix of old and new chunks while a run is in progress. --reindex builds a new
+# collection version from every PDF and swaps the alias only once all of it is upserted.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "256"))   # items per queue
+CHECKPOINT_FILE = Path(os.getenv("PIPELINE_CHECKPOINT_FILE", "pipeline_checkpoint.json"))
+LOCAL_INDEX_OUTPUT = Path("qdrant_ready_embeddings")
+
+_DONE = None  # end-of-stream marker on the queues
+
+
+def file_fingerprint(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def point_id(chunk_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, chunk_id))  # same scheme as upload_to_qdrant.py
+
+
+def point_payload(item) -> dict:
+    payload = {"text": item["text"], **item["metadata"]}
+    return stored_payload(payload) if PAYLOAD_TEXT == "store" else payload
+
+
+class Checkpoint:
+    """
+    Progress of a run, saved after every upsert batch:
+    {document: {"file": sha256, "chunks": {chunk id: content hash}, "complete": bool}}.
+    Complete documents whose PDF is unchanged are skipped on the next run; in an
+    interrupted document only the chunks not yet upserted are embedded again.
+    It is tied to the collection version the points went into (not the alias), so a
+    reindex that moves the alias discards it.
+    """
+
+    def __init__(self, collection_name: str, path: Path = CHECKPOINT_FILE, restart: bool = False):
+        self.path = path
+        self.collection_name = collection_name
+        self.documents = {}
+        if restart or not path.exists():
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("provider") == provider.name and data.get("collection") == collection_name:
+            self.documents = data.get("documents", {})
+        else:
+            logger.info(f"🔁 Checkpoint is for another provider or collection (now '{collection_name}'); starting over")
+
+    def is_complete(self, doc_name: str, fingerprint: str) -> bool:
+        entry = self.documents.get(doc_name)
+        return bool(entry and entry["complete"] and entry["file"] == fingerprint)
+
+    def start(self, doc_name: str, fingerprint: str):
+        """Returns the chunks already upserted for this version of the document."""
+        entry = self.documents.get(doc_name)
+        if entry is None or entry["file"] != fingerprint:
+            previous = entry["chunks"] if entry else {}
+            entry = {"file": fingerprint, "chunks": {}, "complete": False, "previous": previous}
+            self.documents[doc_name] = entry
+        entry["complete"] = False
+        return entry["chunks"]
+
+    def record(self, doc_name: str, chunk_id: str, digest: str):
+        self.documents[doc_name]["chunks"][chunk_id] = digest
+
+    def finish(self, doc_name: str):
+        """Marks a document complete; returns chunk ids of its previous version that no longer exist."""
+        entry = self.documents[doc_name]
+        entry["complete"] = True
+        removed = [chunk_id for chunk_id in entry.pop("previous", {}) if chunk_id not in entry["chunks"]]
+        return removed
+
+    def remove(self, doc_name: str):
+        """Forgets a document whose PDF is gone; returns every chunk id it may still have upserted."""
+        entry = self.documents.pop(doc_name)
+        return sorted(set(entry["chunks"]) | set(entry.get("previous", {})))
+
+    def save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"provider": provider.name, "collection": self.collection_name, "documents": self.documents}, f)
+        os.replace(tmp_path, self.path)
+
+
+class IngestionPipeline:
+    def __init__(self, collection_name: str, pdf_dir: Path = PDF_DIR, workers: int = CHUNK_WORKERS,
+                 write_intermediates: bool = False, restart: bool = False, extraction: str = None,
+                 extraction_overrides: dict = None):
+        self.collection_name = collection_name
+        self.pdf_dir = pdf_dir
+        self.workers = max(1, workers)
+        self.extraction = extraction
+        self.extraction_overrides = extraction_overrides or {}
+        self.write_intermediates = write_intermediates
+        self.checkpoint = Checkpoint(collection_name, restart=restart)
+        self.runner = EmbeddingRunner()
+        self.chunk_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.point_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.outstanding = {}  # document -> chunks not yet upserted (or failed)
+        self.failed = {}       # document -> chunk ids that could not be embedded
+        self.produced = set()  # documents whose chunks are all queued
+        self.kept = {}         # document -> embedded items, for --write-intermediates
+        self.stats = {"documents": 0, "skipped_documents": 0, "failed_documents": 0, "removed_documents": 0,
+                      "resumed_chunks": 0, "upserted": 0, "failed": 0}
+
+    # --- Stage 1: partition PDFs in worker processes ---
+    async def produce(self, documents):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.workers * 2)  # parsed-but-unqueued documents held in memory
+
+        async def partition(pool, doc_name, path, fingerprint):
+            async with slots:
+                try:
+                    chunks = await loop.run_in_executor(pool, build_chunks, doc_name, path, self.extraction, self.extraction_overrides)
+                except Exception as e:
+                    logger.error(f"❌ Error processing {doc_name}: {e}")
+                    self.stats["failed_documents"] += 1
+                    return
+                if self.write_intermediates:
+                    write_chunks(doc_name, chunks)
+                await self.enqueue(doc_name, fingerprint, chunks)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            tasks = []
+            for doc_name, path in documents.items():
+                fingerprint = file_fingerprint(path)
+                if self.checkpoint.is_complete(doc_name, fingerprint):
+                    self.stats["skipped_documents"] += 1
+                    continue
+                tasks.append(partition(pool, doc_name, path, fingerprint))
+            self.stats["documents"] = len(tasks)
+            await asyncio.gather(*tasks)
+        await self.chunk_queue.put(_DONE)
+
+    async def enqueue(self, doc_name, fingerprint, chunks):
+        done = self.checkpoint.start(doc_name, fingerprint)
+        items = [chunk_item(chunk, f"{doc_name}_chunks.json") for chunk in chunks]
+        items = [item for item in items if item is not None]
+        pending = [item for item in items if done.get(item["id"]) != item["hash"]]
+        self.stats["resumed_chunks"] += len(items) - len(pending)
+
+        if PAYLOAD_TEXT == "store" and pending:
+            # Texts land in the store before any point that references them is upserted
+            with TextStoreWriter(TEXT_STORE_DIR) as texts:
+                for item in pending:
+                    texts.add(item["text"], item["hash"])
+
+        self.outstanding[doc_name] = len(pending)
+        if self.write_intermediates:
+            self.kept[doc_name] = {"order": [item["id"] for item in items], "items": {}}
+        for item in pending:
+            item["document"] = doc_name
+            await self.chunk_queue.put(item)
+        self.produced.add(doc_name)
+        if not pending:
+            await self.point_queue.put(("finish", doc_name))
+
+    # --- Stage 2: embed in batches, several batches in flight ---
+    async def embed(self):
+        in_flight = set()
+        slots = asyncio.Semaphore(EMBED_CONCURRENCY)  # batches taken off the queue but not yet embedded
+        finished = False
+        while not finished:
+            await slots.acquire()
+            batch = [await self.chunk_queue.get()]
+            # Take whatever else is already waiting, up to a full batch
+            while len(batch) < EMBED_BATCH_SIZE and not self.chunk_queue.empty():
+                batch.append(self.chunk_queue.get_nowait())
+            if batch[-1] is _DONE:
+                finished = True
+                batch.pop()
+            if not batch:
+                slots.release()
+                continue
+            task = asyncio.create_task(self.embed_batch(batch))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            task.add_done_callback(lambda _: slots.release())
+        await asyncio.gather(*in_flight)
+        await self.point_queue.put(_DONE)
+
+    async def embed_batch(self, batch):
+        failed = await self.runner.embed_batch(batch)
+        failed_ids = {id(item) for item in failed}
+        for item in batch:
+            if id(item) in failed_ids:
+                self.failed.setdefault(item["document"], []).append(item["id"])
+                self.stats["failed"] += 1
+            await self.point_queue.put(("item", item))
+
+    # --- Stage 3: upsert in batches and checkpoint ---
+    async def upsert(self):
+        finished = False
+        while not finished:
+            batch = [await self.point_queue.get()]
+            while len(batch) < UPSERT_BATCH_SIZE and not self.point_queue.empty():
+                batch.append(self.point_queue.get_nowait())
+            if batch[-1] is _DONE:
+                finished = True
+                batch.pop()
+
+            items = [item for kind, item in batch if kind == "item" and "embedding" in item]
+            if items:
+                points = [
+                    PointStruct(id=point_id(item["id"]), vector=list(map(float, item["embedding"])),
+                                payload=point_payload(item))
+                    for item in items
+                ]
+                await asyncio.to_thread(client.upsert, collection_name=self.collection_name, points=points)
+                self.stats["upserted"] += len(points)
+
+            touched = set()
+            for kind, value in batch:
+                if kind == "finish":
+                    touched.add(value)
+                    continue
+                doc_name = value["document"]
+                self.outstanding[doc_name] -= 1
+                touched.add(doc_name)
+                if "embedding" in value:
+                    self.checkpoint.record(doc_name, value["id"], value["hash"])
+                    if self.write_intermediates:
+                        self.kept[doc_name]["items"][value["id"]] = value
+            for doc_name in touched:
+                if doc_name in self.produced and self.outstanding[doc_name] == 0:
+                    await self.finish_document(doc_name)
+            self.checkpoint.save()
+
+    async def finish_document(self, doc_name: str):
+        if self.failed.get(doc_name):
+            logger.error(f"❌ {doc_name}: {len(self.failed[doc_name])} chunks not embedded; rerun to retry them")
+            return
+        removed = self.checkpoint.finish(doc_name)
+        if removed:
+            # Chunks that disappeared from a changed PDF must not stay searchable
+            await asyncio.to_thread(
+                client.delete, collection_name=self.collection_name,
+                points_selector=PointIdsList(points=[point_id(chunk_id) for chunk_id in removed]),
+            )
+        if self.write_intermediates:
+            self.save_vectors(doc_name)
+        logger.info(f"✅ {doc_name} searchable ({len(self.checkpoint.documents[doc_name]['chunks'])} chunks, {len(removed)} stale removed)")
+
+    def save_vectors(self, doc_name: str):
+        kept = self.kept.pop(doc_name)
+        items = [kept["items"][chunk_id] for chunk_id in kept["order"] if chunk_id in kept["items"]]
+        if len(items) < len(kept["order"]):
+            # Resumed documents only hold the chunks embedded in this run
+            logger.warning(f"⚠️ {doc_name} resumed mid-document; not writing its partial vector file")
+            return
+        save_vectors(
+            LOCAL_INDEX_OUTPUT, f"{doc_name}_chunks",
+            ids=[item["id"] for item in items],
+            vectors=[item["embedding"] for item in items],
+            records=[{"text": item["text"], **item["metadata"]} for item in items],
+        )
+
+    def remove_deleted_documents(self, documents):
+        """Deletes the points of checkpointed documents whose PDF is no longer in pdf_dir."""
+        for doc_name in sorted(set(self.checkpoint.documents) - set(documents)):
+            chunk_ids = self.checkpoint.remove(doc_name)
+            if chunk_ids:
+                client.delete(collection_name=self.collection_name,
+                              points_selector=PointIdsList(points=[point_id(chunk_id) for chunk_id in chunk_ids]))
+            if self.write_intermediates:
+                remove_vectors(LOCAL_INDEX_OUTPUT, f"{doc_name}_chunks")
+                (CHUNKS_DIR / f"{doc_name}_chunks.json").unlink(missing_ok=True)
+            self.stats["removed_documents"] += 1
+            logger.info(f"🗑️ {doc_name}: PDF removed, deleted its {len(chunk_ids)} points")
+        self.checkpoint.save()
+
+    async def run(self):
+        documents = discover_documents(self.pdf_dir)
+        logger.info(f"🚀 Pipeline: {len(documents)} PDFs in {self.pdf_dir}, {self.workers} partition workers, provider {provider.name}")
+        await asyncio.gather(self.produce(documents), self.embed(), self.upsert())
+        self.remove_deleted_documents(documents)
+
+        changed = self.stats["upserted"] or self.stats["removed_documents"]
+        if changed and resolve_alias(client, COLLECTION_NAME) == self.collection_name:
+            version = bump_collection_version(COLLECTION_NAME)
+            logger.info(f"🔖 Collection '{COLLECTION_NAME}' version is now {version}")
+            refresh_bundles()
+        logger.info(
+            f"📊 {self.stats['documents']} documents processed, {self.stats['skipped_documents']} unchanged skipped, "
+            f"{self.stats['failed_documents']} could not be partitioned, {self.stats['removed_documents']} removed, "
+            f"{self.stats['resumed_chunks']} chunks already upserted, {self.stats['upserted']} upserted, "
+            f"{self.stats['failed']} failed"
+        )
+        return self.stats
+
+    def succeeded(self) -> bool:
+        return not (self.stats["failed"] or self.stats["failed_documents"])
+
+
+def reindex(pipeline_args) -> bool:
+    """
+    Runs the pipeline over every PDF into a new collection version and swaps the alias to it
+    only if every document made it in; the live collection serves searches meanwhile.
+    """
+    target = create_collection(new_version_name(COLLECTION_NAME))
+    try:
+        pipeline = IngestionPipeline(target, restart=True, **pipeline_args)
+        stats = asyncio.run(pipeline.run())
+    except BaseException:
+        # Never leave an unserved version behind (also on Ctrl-C)
+        client.delete_collection(target)
+        raise
+    if not pipeline.succeeded() or not stats["upserted"]:
+        logger.error(f"❌ Reindex incomplete ({stats['upserted']} upserted); keeping the live collection")
+        client.delete_collection(target)
+        return False
+    publish_version(target)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream policy PDFs through chunking, embedding and upsert in one pass.")
+    parser.add_argument("--pdf-dir", type=Path, default=PDF_DIR)
+    parser.add_argument("--workers", type=int, default=CHUNK_WORKERS, help="partition worker processes")
+    parser.add_argument("--write-intermediates", action="store_true",
+                        help="also write docs_chunks/ and qdrant_ready_embeddings/ (needed by keyword search and the local backend)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and process every document")
+    parser.add_argument("--reindex", action="store_true",
+                        help="build a new collection version from every PDF and swap the alias to it (zero-downtime)")
+    parser.add_argument("--extraction", choices=EXTRACTION_MODES, default=None,
+                        help="element extraction for every document (default: PDF_EXTRACTION / DOCUMENT_EXTRACTION)")
+    parser.add_argument("--extraction-for", type=extraction_override, action="append", default=[], metavar="NAME=MODE",
+                        help="extraction for one document, by file or document name (repeatable)")
+    args = parser.parse_args()
+
+    pipeline_args = {"pdf_dir": args.pdf_dir, "workers": args.workers,
+                     "write_intermediates": args.write_intermediates, "extraction": args.extraction,
+                     "extraction_overrides": dict(args.extraction_for)}
+    if args.reindex:
+        ok = reindex(pipeline_args)
+    else:
+        # Incremental: upserts go into the collection the alias serves (not zero-downtime)
+        pipeline = IngestionPipeline(ensure_live_collection(), restart=args.restart, **pipeline_args)
+        asyncio.run(pipeline.run())
+        ok = pipeline.succeeded()
+    sys.exit(0 if ok else 1)
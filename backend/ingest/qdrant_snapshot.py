@@ -0,0 +1,152 @@
+import os
+import sys
+import shutil
+import logging
+import tarfile
+import tempfile
+from pathlib import Path
+import httpx
+
+# Make the repo root importable when run as a script
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from backend.collection_version import bump_collection_version
+from backend.collection_aliases import new_version_name, resolve_alias, swap_alias, garbage_collect
+from backend.text_store import TEXT_STORE_DIR
+from backend.context_bundles import refresh_bundles
+from backend.qdrant_connection import create_client, is_local_mode, local_storage_path, QDRANT_URL
+
+# --- Basic Logging Configuration ---
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "policy_chunks")
+SNAPSHOT_TIMEOUT = float(os.getenv("QDRANT_SNAPSHOT_TIMEOUT", "300"))
+
+# Server mode uses Qdrant's native collection snapshots (downloaded/uploaded over REST).
+# Embedded mode (QDRANT_PATH) has no snapshot API, so the storage folder itself is archived;
+# it must not be open in another process while exporting or importing.
+# Snapshots belong to a concrete collection, so export resolves the alias first and import
+# restores into a new version, then swaps the alias (see backend/collection_aliases.py).
+# Payloads reference chunk texts in TEXT_STORE_DIR (backend/text_store.py), so that folder
+# travels alongside as "<snapshot file>.text.tar.gz".
+
+
+def text_store_archive(snapshot_file: Path) -> Path:
+    return snapshot_file.with_name(f"{snapshot_file.name}.text.tar.gz")
+
+
+def export_text_store(snapshot_file: Path):
+    if not TEXT_STORE_DIR.exists():
+        return
+    archive = text_store_archive(snapshot_file)
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(TEXT_STORE_DIR, arcname=".")
+    logging.info(f"📦 Archived chunk texts {TEXT_STORE_DIR} -> {archive}")
+
+
+def import_text_store(snapshot_file: Path):
+    archive = text_store_archive(snapshot_file)
+    if not archive.exists():
+        return
+    # Segments have unique names and are keyed by content hash, so extracting over an existing store only adds texts
+    TEXT_STORE_DIR.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(archive, "r:gz") as tar:
+        tar.extractall(TEXT_STORE_DIR, filter="data")
+    logging.info(f"♻️ Restored chunk texts {TEXT_STORE_DIR} from {archive}")
+
+
+def export_snapshot(output_file: str) -> Path:
+    """Writes a restorable copy of the collection (server) or storage folder (local) to `output_file`."""
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    if is_local_mode():
+        storage = local_storage_path()
+        if not storage.exists():
+            raise FileNotFoundError(f"📁 Local Qdrant storage not found: {storage}")
+        with tarfile.open(output_file, "w:gz") as tar:
+            tar.add(storage, arcname=".")
+        logging.info(f"📦 Archived local storage {storage} -> {output_file}")
+        export_text_store(output_file)
+        return output_file
+
+    client = create_client()
+    collection = resolve_alias(client, COLLECTION_NAME)
+    if collection is None:
+        raise ValueError(f"Collection '{COLLECTION_NAME}' does not exist")
+    snapshot = client.create_snapshot(collection_name=collection, wait=True)
+    url = f"{QDRANT_URL}/collections/{collection}/snapshots/{snapshot.name}"
+    try:
+        with httpx.stream("GET", url, timeout=SNAPSHOT_TIMEOUT) as response:
+            response.raise_for_status()
+            with open(output_file, "wb") as f:
+                for block in response.iter_bytes():
+                    f.write(block)
+    finally:
+        # The copy lives locally now; free the server's disk
+        client.delete_snapshot(collection_name=collection, snapshot_name=snapshot.name)
+
+    logging.info(f"📦 Saved snapshot '{snapshot.name}' ({output_file.stat().st_size // 1024} KB) -> {output_file}")
+    export_text_store(output_file)
+    return output_file
+
+
+def import_snapshot(snapshot_file: str):
+    """Restores the collection from a file written by export_snapshot, replacing what the alias serves."""
+    snapshot_file = Path(snapshot_file)
+    if not snapshot_file.exists():
+        raise FileNotFoundError(f"📁 Snapshot not found: {snapshot_file}")
+
+    # Texts first: the restored points reference them
+    import_text_store(snapshot_file)
+    if is_local_mode():
+        storage = local_storage_path()
+        storage.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".qdrant_restore_", dir=storage.parent))
+        with tarfile.open(snapshot_file, "r:gz") as tar:
+            tar.extractall(staging, filter="data")
+        if storage.exists():
+            shutil.rmtree(storage)
+        os.replace(staging, storage)
+        logging.info(f"♻️ Restored local storage {storage} from {snapshot_file}")
+    else:
+        client = create_client()
+        target = new_version_name(COLLECTION_NAME)
+        url = f"{QDRANT_URL}/collections/{target}/snapshots/upload"
+        try:
+            with open(snapshot_file, "rb") as f:
+                response = httpx.post(
+                    url,
+                    params={"priority": "snapshot", "wait": "true"},
+                    files={"snapshot": (snapshot_file.name, f, "application/octet-stream")},
+                    timeout=SNAPSHOT_TIMEOUT,
+                )
+            response.raise_for_status()
+        except BaseException:
+            # A failed recovery can leave a partial collection; garbage_collect would keep it as a rollback copy
+            if client.collection_exists(target):
+                client.delete_collection(target)
+            raise
+        previous = swap_alias(client, COLLECTION_NAME, target)
+        garbage_collect(client, COLLECTION_NAME, previous=previous)
+        logging.info(f"♻️ Restored collection '{target}' from {snapshot_file} and switched '{COLLECTION_NAME}' to it")
+
+    # Restored data replaces whatever was indexed: drop cached retrieval results
+    bump_collection_version(COLLECTION_NAME)
+    refresh_bundles()
+
+
+if __name__ == "__main__":
+    # python backend/ingest/qdrant_snapshot.py export snapshots/policy_chunks.snapshot
+    # python backend/ingest/qdrant_snapshot.py import snapshots/policy_chunks.snapshot
+    if len(sys.argv) != 3 or sys.argv[1] not in ("export", "import"):
+        print("Usage: qdrant_snapshot.py export|import <snapshot file>")
+        sys.exit(1)
+
+    if sys.argv[1] == "export":
+        export_snapshot(sys.argv[2])
+    else:
+        import_snapshot(sys.argv[2])
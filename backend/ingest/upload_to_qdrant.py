@@ -1,10 +1,25 @@
 import os
+import sys
 import json
 import logging
 import uuid
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct, VectorParams, Distance
+from qdrant_client.http.models import PointStruct
+
+# Make the repo root importable when run as a script from data/
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from backend.collection_version import bump_collection_version
+from backend.context_bundles import refresh_bundles
+from backend.vector_store import list_documents, iter_batches
+from backend.embeddings import get_embedding_dims
+from backend.collection_profiles import COLLECTION_PROFILE, PAYLOAD_INDEXES, collection_config
+from backend.collection_aliases import new_version_name, resolve_alias, swap_alias, garbage_collect, list_versions
+from backend.text_store import PAYLOAD_TEXT, TEXT_STORE_DIR, TextStoreWriter, stored_payload, compact
+from backend.qdrant_connection import create_client, is_local_mode, local_storage_path, QDRANT_URL
 
 # --- Basic Logging Configuration ---
 logging.basicConfig(
@@ -15,66 +30,246 @@ logging.basicConfig(
 
 # --- Environment and Constants ---
 load_dotenv()
-QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
-COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "policy_chunks")
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "policy_chunks")  # alias the retriever queries
 EMBEDDINGS_FOLDER = os.path.join(os.getcwd(), "qdrant_ready_embeddings")  # ✅ Use formatted folder
+VECTOR_SIZE = get_embedding_dims()  # EMBEDDING_DIMS: 1536 (default), 512 or 256
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))  # points per upsert request
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))  # upsert requests in flight
 
-# --- Qdrant Client ---
-client = QdrantClient(url=QDRANT_URL)
+# --- Qdrant Client (server at QDRANT_URL, or embedded on-disk storage at QDRANT_PATH) ---
+client = create_client()
+logging.info(f"🔌 Qdrant: {'local storage ' + str(local_storage_path()) if is_local_mode() else QDRANT_URL}")
 
-def create_collection():
-    """Ensures the Qdrant collection exists."""
+def create_collection(name: str = None):
+    """
+    Ensures collection `name` exists (default: the one the alias serves, else COLLECTION_NAME),
+    laid out per QDRANT_PROFILE (see backend/collection_profiles.py).
+    """
+    name = name or resolve_alias(client, COLLECTION_NAME) or COLLECTION_NAME
     try:
         collections = [c.name for c in client.get_collections().collections]
-        if COLLECTION_NAME not in collections:
+        if name not in collections:
             client.create_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config=VectorParams(size=1536, distance=Distance.COSINE),
+                collection_name=name,
+                **collection_config(VECTOR_SIZE, COLLECTION_PROFILE),
             )
-            logging.info(f"✅ Created collection: '{COLLECTION_NAME}'")
+            logging.info(f"✅ Created collection: '{name}' ({VECTOR_SIZE} dims, profile '{COLLECTION_PROFILE}')")
         else:
-            logging.info(f"Collection '{COLLECTION_NAME}' already exists.")
+            size = client.get_collection(name).config.params.vectors.size
+            if size != VECTOR_SIZE:
+                raise ValueError(
+                    f"Collection '{name}' holds {size}-dim vectors but EMBEDDING_DIMS={VECTOR_SIZE}; "
+                    f"run a full reindex (without --in-place) to build a {VECTOR_SIZE}-dim version."
+                )
+            logging.info(f"Collection '{name}' already exists (its layout is kept; reindex to change profile).")
+
+        # Idempotent: Qdrant keeps an existing index with the same schema
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            client.create_payload_index(
+                collection_name=name,
+                field_name=field_name,
+                field_schema=schema,
+            )
+        logging.info(f"🗂️ Payload indexes ensured on: {', '.join(PAYLOAD_INDEXES)}")
     except Exception as e:
         logging.error(f"❌ Could not check or create collection: {e}")
         raise
+    return name
+
+def ensure_live_collection() -> str:
+    """Collection behind the alias, creating a first version (and the alias) if there is none."""
+    live = resolve_alias(client, COLLECTION_NAME)
+    if live is not None:
+        return create_collection(live)
+    target = create_collection(new_version_name(COLLECTION_NAME))
+    swap_alias(client, COLLECTION_NAME, target)
+    return target
+
+def build_points(filename, ids, vectors, payloads):
+    points = []
+    for chunk_id, vector, payload in zip(ids, vectors, payloads):
+        try:
+            points.append(
+                PointStruct(
+                    id=str(uuid.uuid5(uuid.NAMESPACE_DNS, chunk_id)),  # UUID from ID
+                    vector=vector.tolist(),
+                    payload=stored_payload(payload) if PAYLOAD_TEXT == "store" else payload
+                )
+            )
+        except Exception as chunk_err:
+            logging.warning(f"⚠️ Skipping bad chunk in {filename}: {chunk_err}")
+    return points
+
+def upsert_batch(collection_name: str, points, wait_for_apply: bool = False) -> int:
+    # wait=False returns once Qdrant has logged the batch (WAL), before it is indexed
+    client.upsert(collection_name=collection_name, points=points, wait=wait_for_apply)
+    return len(points)
+
+def consistency_barrier(collection_name: str, point):
+    """
+    Re-sends one already uploaded point with wait=True. Qdrant applies a shard's
+    updates in order, so once this returns every earlier acknowledged batch is applied
+    and visible to searches.
+    """
+    upsert_batch(collection_name, [point], wait_for_apply=True)
 
-def load_and_upload_embeddings():
-    """Loads embeddings from JSON files and upserts them into the Qdrant collection."""
-    for filename in os.listdir(EMBEDDINGS_FOLDER):
-        if filename.endswith(".json"):
-            filepath = os.path.join(EMBEDDINGS_FOLDER, filename)
+def store_chunk_texts(batch_size: int = UPSERT_BATCH_SIZE) -> int:
+    """Writes every chunk text in the embedding files to the text store, before any point references it."""
+    with TextStoreWriter(TEXT_STORE_DIR) as texts:
+        for filename in list_documents(EMBEDDINGS_FOLDER):
+            for _, _, payloads in iter_batches(EMBEDDINGS_FOLDER, filename, batch_size):
+                for payload in payloads:
+                    texts.add(payload.get("text", ""), payload.get("content_hash"))
+    return len(texts.entries)
+
+def referenced_text_keys(collections) -> set:
+    """content_hash of every point in `collections` (payload only, no vectors)."""
+    keys = set()
+    for name in collections:
+        offset = None
+        while True:
+            points, offset = client.scroll(collection_name=name, limit=1024, offset=offset,
+                                           with_payload=["content_hash"], with_vectors=False)
+            keys.update(point.payload["content_hash"] for point in points if point.payload.get("content_hash"))
+            if offset is None:
+                break
+    return keys
+
+def load_and_upload_embeddings(collection_name: str = COLLECTION_NAME, batch_size: int = UPSERT_BATCH_SIZE,
+                               workers: int = UPLOAD_WORKERS):
+    """
+    Loads embeddings (memory-mapped .npy or legacy JSON) and upserts them into `collection_name`
+    in batches of `batch_size` points, with `workers` requests in flight.
+    Returns (points uploaded, failures), failures counting points whose upsert failed plus
+    files that could not be read in full.
+    """
+    if is_local_mode():
+        workers = 1  # embedded storage is not safe to write from several threads
+    if PAYLOAD_TEXT == "store":
+        store_chunk_texts(batch_size)
+    providers = set()  # embedding_provider recorded in each point's payload
+    uploaded = failed = 0
+    last_point = None
+    start = time.perf_counter()
+
+    pending = {}
+    def collect(done):
+        nonlocal uploaded, failed
+        for future in done:
+            filename, count = pending.pop(future)
+            try:
+                uploaded += future.result()
+            except Exception as e:
+                failed += count
+                logging.error(f"❌ Upsert of {count} points from {filename} failed: {e}")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for filename in list_documents(EMBEDDINGS_FOLDER):
             logging.info(f"📁 Processing file: {filename}")
             try:
-                with open(filepath, "r") as f:
-                    chunks = json.load(f)
-
-                points = []
-                for chunk in chunks:
-                    try:
-                        points.append(
-                            PointStruct(
-                                id=str(uuid.uuid5(uuid.NAMESPACE_DNS, chunk["id"])),  # UUID from ID
-                                vector=chunk["vector"],
-                                payload=chunk["payload"]
-                            )
-                        )
-                    except Exception as chunk_err:
-                        logging.warning(f"⚠️ Skipping bad chunk in {filename}: {chunk_err}")
-
-                if not points:
+                file_start = time.perf_counter()
+                file_points = 0
+                # Rows are read and points built one batch at a time, so memory stays flat
+                # however large the file is
+                for ids, vectors, payloads in iter_batches(EMBEDDINGS_FOLDER, filename, batch_size):
+                    if vectors.shape[1] != VECTOR_SIZE:
+                        logging.error(f"❌ {filename} has {vectors.shape[1]}-dim vectors, collection expects {VECTOR_SIZE}; rerun transform_to_qdrant.py.")
+                        failed += 1
+                        break
+                    points = build_points(filename, ids, vectors, payloads)
+                    if not points:
+                        continue
+
+                    file_providers = {p.payload.get("embedding_provider", "unknown") for p in points}
+                    if len(file_providers | providers) > 1 and not file_providers <= providers:
+                        logging.warning(f"⚠️ Mixing embedding providers in one collection: {sorted(file_providers | providers)}")
+                    providers |= file_providers
+
+                    # Bounded in-flight requests: built batches never pile up in memory
+                    while len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending[pool.submit(upsert_batch, collection_name, points)] = (filename, len(points))
+                    file_points += len(points)
+                    last_point = points[-1]
+
+                if not file_points:
                     logging.warning(f"⚠️ No valid points in {filename}, skipping.")
                     continue
-
-                client.upsert(collection_name=COLLECTION_NAME, points=points)
-                logging.info(f"⬆️  Uploaded {len(points)} vectors from {filename}")
+                logging.info(f"⬆️  Queued {file_points} vectors from {filename} in {time.perf_counter() - file_start:.2f}s")
 
             except json.JSONDecodeError:
                 logging.error(f"❌ Error decoding JSON from file: {filename}")
+                failed += 1
             except Exception as e:
                 logging.error(f"❌ Unexpected error with {filename}: {e}")
+                failed += 1
+
+        collect(wait(pending).done)
+
+    if last_point is not None:
+        consistency_barrier(collection_name, last_point)
+    elapsed = time.perf_counter() - start
+    rate = uploaded / elapsed if elapsed else 0.0
+    logging.info(
+        f"🚚 Uploaded {uploaded} points in {elapsed:.2f}s ({rate:.0f} points/s, batch {batch_size}, {workers} workers)"
+        + (f", {failed} failed" if failed else "")
+    )
+
+    if providers:
+        logging.info(f"🧬 Collection '{collection_name}' embedding provider(s): {', '.join(sorted(providers))}")
+    return uploaded, failed
+
+def bump_version():
+    # Invalidate cached retrieval results for this collection
+    version = bump_collection_version(COLLECTION_NAME)
+    logging.info(f"🔖 Collection '{COLLECTION_NAME}' version is now {version}")
+
+def reindex() -> bool:
+    """
+    Builds a new collection version from every embedding file and switches the alias to it
+    only if the whole upload succeeded; the live collection serves searches meanwhile.
+    """
+    target = create_collection(new_version_name(COLLECTION_NAME))
+    try:
+        uploaded, failed = load_and_upload_embeddings(target)
+    except BaseException:
+        # Never leave an unserved version behind; garbage_collect would count it as a rollback copy
+        client.delete_collection(target)
+        raise
+    if failed or not uploaded:
+        logging.error(f"❌ Reindex incomplete ({uploaded} uploaded, {failed} failed); keeping the live collection")
+        client.delete_collection(target)
+        return False
+
+    publish_version(target)
+    return True
+
+def publish_version(target: str):
+    """Points the alias at a fully built version, then drops old versions and their texts."""
+    previous = swap_alias(client, COLLECTION_NAME, target)
+    bump_version()
+    garbage_collect(client, COLLECTION_NAME, previous=previous)
+    if PAYLOAD_TEXT == "store":
+        # Drop texts only deleted versions referenced
+        compact(TEXT_STORE_DIR, referenced_text_keys(list_versions(client, COLLECTION_NAME)))
+    refresh_bundles()
+
+def upload_in_place() -> bool:
+    """Upserts into the collection the alias serves (searches may see a mix while it runs)."""
+    uploaded, failed = load_and_upload_embeddings(ensure_live_collection())
+    if uploaded:
+        bump_version()
+        refresh_bundles()
+    return not failed
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload embeddings to Qdrant.")
+    parser.add_argument("--in-place", action="store_true",
+                        help="upsert into the live collection instead of building a new version and swapping the alias")
+    args = parser.parse_args()
+
     logging.info("🚀 Starting embedding upload process...")
-    create_collection()
-    load_and_upload_embeddings()
-    logging.info("✅ Done. All embeddings processed.")
+    ok = upload_in_place() if args.in_place else reindex()
+    logging.info("✅ Done. All embeddings processed." if ok else "❌ Upload finished with errors.")
+    sys.exit(0 if ok else 1)
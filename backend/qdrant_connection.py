@@ -0,0 +1,43 @@
+import os
+import threading
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from backend.collection_version import repo_path
+
+load_dotenv()
+
+# Server mode by default. Setting QDRANT_PATH switches ingestion and retrieval to
+# qdrant_client's embedded on-disk mode (no Qdrant service); see repo_path for relative paths.
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_PATH = os.getenv("QDRANT_PATH")
+
+_local_client = None
+_local_client_lock = threading.Lock()
+
+
+def local_storage_path():
+    """Resolved on-disk storage folder, or None in server mode."""
+    return repo_path(QDRANT_PATH) if QDRANT_PATH else None
+
+
+def is_local_mode() -> bool:
+    return bool(QDRANT_PATH)
+
+
+def create_client() -> QdrantClient:
+    global _local_client
+    if is_local_mode():
+        # Embedded storage is locked to one client per process; share the instance
+        # (the ingest scripts and the retriever both open it when bundles are rebuilt)
+        with _local_client_lock:
+            if _local_client is None:
+                _local_client = QdrantClient(path=str(local_storage_path()))
+            return _local_client
+    return QdrantClient(url=QDRANT_URL)
+
+
+def create_async_client() -> AsyncQdrantClient:
+    """Async client for server mode; embedded mode has no separate async access to the same folder."""
+    if is_local_mode():
+        raise RuntimeError("❌ Async Qdrant client is not available in local mode (QDRANT_PATH); use the sync client.")
+    return AsyncQdrantClient(url=QDRANT_URL)
@@ -0,0 +1,85 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Size-bounded LRU for retrieval results with a freshness window.
+    Entries older than `ttl` seconds are still served but reported as stale,
+    so the caller can refresh them in the background (stale-while-revalidate).
+    Keys end with (scope, collection version); a reindex therefore never hits
+    an old entry, and `drop_other_versions` frees them eagerly.
+    """
+
+    def __init__(self, max_items: int = 512, ttl: float = 300.0):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._versions = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns (value, is_stale) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            value, stored_at = entry
+            stale = time.monotonic() - stored_at > self.ttl
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return value, stale
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def drop_other_versions(self, scope, version):
+        """
+        Evicts entries of `scope` whose version differs from `version`.
+        Keys end with (scope, version); scopes (e.g. backend + mode) age independently.
+        """
+        with self._lock:
+            if self._versions.get(scope) == version:
+                return
+            self._versions[scope] = version
+            for key in [k for k in self._entries if k[-2] == scope and k[-1] != version]:
+                del self._entries[key]
+
+    def refresh_async(self, key, loader):
+        """Recomputes `key` on a daemon thread; concurrent refreshes of one key are collapsed."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.put(key, loader())
+            except Exception as e:
+                print(f"⚠️ Background refresh failed for {key[0]!r}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "items": len(self._entries),
+        }
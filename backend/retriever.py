@@ -1,40 +1,601 @@
 import os
+import sys
+import json
+import uuid
+import asyncio
+import threading
+from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
 import openai
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import SearchParams
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.http.models import (
+    SearchParams, SearchRequest, Filter, FieldCondition, MatchAny,
+    IsEmptyCondition, PayloadField
+)
+from backend.embedding_cache import EmbeddingCache, normalize_text
+from backend.result_cache import ResultCache
+from backend.collection_version import get_collection_version, get_folder_version, repo_path
+from backend.bm25 import BM25Index, reciprocal_rank_fusion
+from backend.vector_store import iter_documents
+from backend.text_store import TextStore, TEXT_STORE_DIR, chunk_text
+from backend.embeddings import get_embedding_provider
+from backend.qdrant_connection import create_client, create_async_client, is_local_mode
+from backend.collection_profiles import quantization_search_params
 
 # Load .env file
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# Setup Qdrant client
-qdrant = QdrantClient(host="localhost", port=6333)
-COLLECTION_NAME = "policy_chunks"
+# Qdrant clients are created lazily on first use and shared process-wide,
+# so importing this module never needs a live Qdrant. QDRANT_URL / QDRANT_PATH
+# (embedded on-disk mode) are read in backend/qdrant_connection.py.
+# Searches go through the QDRANT_COLLECTION alias, which reindexing repoints at a
+# freshly built collection version (backend/collection_aliases.py).
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "policy_chunks")
 
-def get_openai_embedding(text: str):
-    response = openai.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
+# Retrieval backend: "qdrant" (server) or "local" (in-process NumPy index)
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "qdrant")
+LOCAL_INDEX_DIR = repo_path(os.getenv("LOCAL_INDEX_DIR", "data/qdrant_ready_embeddings"))
+
+# Retrieval mode: "vector" (dense only), "keyword" (BM25 only, no embedding call)
+# or "hybrid" (both, merged by reciprocal-rank fusion)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+BM25_CHUNKS_DIR = repo_path(os.getenv("BM25_CHUNKS_DIR", "data/docs_chunks"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # per side, before fusion
+RRF_K = 60
+
+# HNSW search breadth for Qdrant queries (see benchmarks/retrieval_benchmark.py)
+HNSW_EF = int(os.getenv("HNSW_EF", "128"))
+
+# Structured filters accepted by the retriever, mapped to payload keys.
+# Values may be a string or a list of strings (match any).
+FILTER_FIELDS = {
+    "source": "source",
+    "section_title": "section_title",
+    "type": "type",
+    "band": "bands",
+}
+
+# Query-embedding cache: in-memory LRU backed by an on-disk SQLite store.
+# Entries are keyed by provider name, so switching EMBEDDING_PROVIDER never mixes vectors.
+embedding_cache = EmbeddingCache(
+    repo_path(os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite3")),
+    max_items=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+)
+
+# Retrieval result cache keyed by (normalized query, top_k, backend, collection version).
+# Entries older than RESULT_CACHE_TTL seconds are served once more and refreshed in the background.
+result_cache = ResultCache(
+    max_items=int(os.getenv("RESULT_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "300")),
+)
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+def _validate_filters(filters: dict):
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"❌ Unknown filter field(s): {', '.join(sorted(unknown))}")
+
+def payload_matches(payload: dict, filters: dict) -> bool:
+    """Python equivalent of build_qdrant_filter, used by the local backend."""
+    for name, value in filters.items():
+        wanted = set(_as_list(value))
+        if name == "band":
+            # Chunks without band tags apply to every band
+            bands = payload.get("bands") or []
+            if bands and not wanted.intersection(bands):
+                return False
+        elif payload.get(FILTER_FIELDS[name]) not in wanted:
+            return False
+    return True
+
+def build_qdrant_filter(filters: dict):
+    """
+    Translates {"source": [...], "type": "table", "band": "L3"} into a Qdrant Filter.
+    Fields are ANDed, list values are ORed; "band" also matches band-agnostic chunks.
+    """
+    if not filters:
+        return None
+
+    _validate_filters(filters)
+    must = []
+    for name, value in filters.items():
+        condition = FieldCondition(key=FILTER_FIELDS[name], match=MatchAny(any=_as_list(value)))
+        if name == "band":
+            condition = Filter(should=[
+                condition,
+                IsEmptyCondition(is_empty=PayloadField(key=FILTER_FIELDS[name])),
+            ])
+        must.append(condition)
+    return Filter(must=must)
+
+def _freeze_filters(filters: dict):
+    if not filters:
+        return None
+    _validate_filters(filters)
+    return tuple(sorted((name, tuple(sorted(_as_list(value)))) for name, value in filters.items()))
+
+def chunk_point_id(chunk_id: str) -> str:
+    """Qdrant point id of a chunk (same UUID5 scheme as upload_to_qdrant.py)."""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, chunk_id))
+
+
+class LocalVectorIndex:
+    """
+    In-process cosine index over the qdrant-ready embedding files.
+    Binary (.npy) documents are memory-mapped and scored in place (zero-copy);
+    legacy JSON documents are parsed into float32 arrays. Row norms are
+    precomputed, so a query is one matrix product per document plus argpartition.
+    """
+
+    def __init__(self, folder: Path = LOCAL_INDEX_DIR):
+        self.ids, self.payloads, self.segments = [], [], []
+        for _, ids, matrix, records in iter_documents(folder):
+            self.ids.extend(ids)
+            self.payloads.extend(records)
+            self.segments.append(matrix)
+
+        if not self.segments:
+            raise FileNotFoundError(f"📁 No embedding files found in {folder}")
+
+        norms = np.concatenate([np.linalg.norm(segment.astype(np.float32), axis=1) for segment in self.segments])
+        norms[norms == 0] = 1.0
+        self.inv_norms = (1.0 / norms).astype(np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def vector(self, i: int) -> np.ndarray:
+        """Row `i` as float32 (mainly for diagnostics and benchmarks)."""
+        for segment in self.segments:
+            if i < segment.shape[0]:
+                return np.asarray(segment[i], dtype=np.float32)
+            i -= segment.shape[0]
+        raise IndexError(i)
+
+    def search(self, query_vector, top_k: int = 5, filters: dict = None):
+        """Returns (id, score, payload) tuples, best first, like a Qdrant cosine search."""
+        return self.search_many([query_vector], top_k, filters)[0]
+
+    def search_many(self, query_vectors, top_k: int = 5, filters: dict = None, with_vectors: bool = False):
+        """
+        Scores every query against every document matrix; returns one result list per query.
+        With `with_vectors`, each hit also carries its stored vector: (id, score, payload, vector).
+        """
+        rows = np.arange(len(self.ids))
+        if filters:
+            _validate_filters(filters)
+            rows = np.flatnonzero([payload_matches(p, filters) for p in self.payloads])
+
+        k = min(top_k, len(rows))
+        if k <= 0:
+            return [[] for _ in query_vectors]
+
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries_t = (queries / norms).T
+        scores = np.concatenate([segment @ queries_t for segment in self.segments], axis=0)
+        scores = (scores * self.inv_norms[:, None]).T
+        if len(rows) != len(self.ids):
+            scores = scores[:, rows]
+
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top], kind="stable")]
+            if with_vectors:
+                results.append([(self.ids[rows[i]], float(row[i]), self.payloads[rows[i]], self.vector(int(rows[i]))) for i in top])
+            else:
+                results.append([(self.ids[rows[i]], float(row[i]), self.payloads[rows[i]]) for i in top])
+        return results
+
+
+_local_index = None
+_local_index_version = None
+
+def get_local_index() -> LocalVectorIndex:
+    """Loads the local index once, and again whenever the embedding files change."""
+    global _local_index, _local_index_version
+    version = get_folder_version(LOCAL_INDEX_DIR)
+    if _local_index is None or version != _local_index_version:
+        _local_index = LocalVectorIndex(LOCAL_INDEX_DIR)
+        _local_index_version = version
+    return _local_index
+
+_bm25_index = None
+_bm25_version = None
+
+def get_bm25_index() -> BM25Index:
+    """
+    Builds the BM25 inverted index from docs_chunks once, and again whenever the chunks change.
+    Chunks are indexed as chunk_text() renders them, so keyword hits read like vector hits.
+    """
+    global _bm25_index, _bm25_version
+    version = get_folder_version(BM25_CHUNKS_DIR)
+    if _bm25_index is None or version != _bm25_version:
+        documents = []
+        for filepath in sorted(BM25_CHUNKS_DIR.glob("*.json")):
+            with open(filepath, "r", encoding="utf-8") as f:
+                for chunk in json.load(f):
+                    text = chunk_text(chunk)
+                    if text.strip():
+                        documents.append((chunk_point_id(chunk["id"]), text, chunk.get("metadata", {})))
+        _bm25_index = BM25Index(documents)
+        _bm25_version = version
+    return _bm25_index
+
+_text_store = None
+_text_store_version = None
+
+def get_text_store() -> TextStore:
+    """Maps the chunk-text store once, and again whenever ingestion adds a segment."""
+    global _text_store, _text_store_version
+    version = get_folder_version(TEXT_STORE_DIR)
+    if _text_store is None or version != _text_store_version:
+        _text_store = TextStore(TEXT_STORE_DIR)
+        _text_store_version = version
+    return _text_store
+
+def payload_texts(payloads):
+    """
+    Chunk texts for search-hit payloads: inline "text" when the payload has it (local
+    backend, QDRANT_PAYLOAD_TEXT=inline), else looked up in the text store by content_hash.
+    Raises LookupError when a text is not in the store, rather than returning empty context.
+    """
+    texts = [payload.get("text") for payload in payloads]
+    missing = [i for i, text in enumerate(texts) if text is None]
+    if missing:
+        store = get_text_store()
+        for i in missing:
+            texts[i] = store.get(payloads[i].get("content_hash"))
+        unresolved = [payloads[i].get("content_hash") for i in missing if texts[i] is None]
+        if unresolved:
+            raise LookupError(
+                f"❌ {len(unresolved)} chunk text(s) not found in the text store {TEXT_STORE_DIR} "
+                f"(e.g. {unresolved[0]}). Check TEXT_STORE_DIR or re-run upload_to_qdrant.py."
+            )
+    return texts
+
+def get_index_version(backend: str, mode: str = "vector") -> str:
+    """Version token that changes on every reindex of the indexes used by backend + mode."""
+    vector_version = (
+        get_folder_version(LOCAL_INDEX_DIR) if backend == "local"
+        else get_collection_version(get_qdrant_client(), COLLECTION_NAME)
     )
-    return response.data[0].embedding
+    if mode == "vector":
+        return vector_version
+    keyword_version = get_folder_version(BM25_CHUNKS_DIR)
+    if mode == "keyword":
+        return keyword_version
+    return f"{vector_version}+{keyword_version}"
+
+_qdrant = None
+_async_qdrant = None
+_client_lock = threading.Lock()
+
+def get_qdrant_client() -> QdrantClient:
+    global _qdrant
+    if _qdrant is None:
+        with _client_lock:
+            if _qdrant is None:
+                _qdrant = create_client()
+    return _qdrant
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Shared async client; its HTTP connection pool keeps connections alive between requests."""
+    global _async_qdrant
+    if _async_qdrant is None:
+        with _client_lock:
+            if _async_qdrant is None:
+                _async_qdrant = create_async_client()
+    return _async_qdrant
+
+def get_query_embedding(text: str):
+    return get_query_embeddings([text])[0]
+
+def get_query_embeddings(texts):
+    """
+    Embeds many texts with a single provider call (list input).
+    Cached texts are skipped; results come back in input order.
+    """
+    provider = get_embedding_provider()
+    embeddings, missing = _cached_embeddings(provider, texts)
+    if missing:
+        _store_embeddings(provider, texts, embeddings, missing, provider.embed([texts[i] for i in missing]))
+    return embeddings
+
+async def aget_query_embeddings(texts):
+    """Async get_query_embeddings; misses go through the provider's async client."""
+    provider = get_embedding_provider()
+    embeddings, missing = _cached_embeddings(provider, texts)
+    if missing:
+        _store_embeddings(provider, texts, embeddings, missing, await provider.aembed([texts[i] for i in missing]))
+    return embeddings
 
-def retrieve_relevant_chunks(query: str, top_k: int = 5):
-    query_vector = get_openai_embedding(query)
-    results = qdrant.search(
+def _cached_embeddings(provider, texts):
+    embeddings = [embedding_cache.get(provider.name, text) for text in texts]
+    return embeddings, [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+def _store_embeddings(provider, texts, embeddings, missing, fresh):
+    for i, embedding in zip(missing, fresh):
+        embeddings[i] = embedding
+        embedding_cache.put(provider.name, texts[i], embedding)
+
+_provider_checked = False
+
+def _check_provider(payload: dict):
+    """Warns once if the indexed chunks were embedded by a different provider than queries."""
+    global _provider_checked
+    if _provider_checked or payload is None:
+        return
+    _provider_checked = True
+    indexed = payload.get("embedding_provider")
+    current = get_embedding_provider().name
+    if indexed and indexed != current:
+        print(f"⚠️ Collection was embedded with '{indexed}' but queries use '{current}'. Re-ingest or set EMBEDDING_PROVIDER.")
+
+def _search_params(hnsw_ef: int = None) -> SearchParams:
+    # Quantized profiles (QDRANT_PROFILE) rescore oversampled int8 candidates with the originals
+    return SearchParams(hnsw_ef=hnsw_ef or HNSW_EF, quantization=quantization_search_params())
+
+def _search_kwargs(query_vector, top_k: int, filters: dict = None, hnsw_ef: int = None, with_vectors: bool = False):
+    return dict(
         collection_name=COLLECTION_NAME,
         query_vector=query_vector,
+        query_filter=build_qdrant_filter(filters),
         limit=top_k,
-        search_params=SearchParams(hnsw_ef=128)
+        search_params=_search_params(hnsw_ef),
+        with_vectors=with_vectors
     )
-    return [hit.payload.get("text", "") for hit in results]
+
+def _search_batch_kwargs(query_vectors, top_k: int, filters: dict = None, hnsw_ef: int = None, with_vectors: bool = False):
+    query_filter = build_qdrant_filter(filters)
+    return dict(
+        collection_name=COLLECTION_NAME,
+        requests=[
+            SearchRequest(
+                vector=vector,
+                filter=query_filter,
+                limit=top_k,
+                params=_search_params(hnsw_ef),
+                with_payload=True,
+                with_vector=with_vectors
+            )
+            for vector in query_vectors
+        ]
+    )
+
+def _local_hits(query_vectors, top_k: int, filters: dict = None, with_vectors: bool = False):
+    batch = get_local_index().search_many(query_vectors, top_k, filters, with_vectors)
+    return [
+        [(chunk_point_id(hit[0]), hit[2], hit[1], hit[3] if with_vectors else None) for hit in results]
+        for results in batch
+    ]
+
+def _qdrant_hits(batch):
+    return _checked_hits([[(str(hit.id), hit.payload, hit.score, hit.vector) for hit in results] for results in batch])
+
+def _checked_hits(hits):
+    for results in hits:
+        if results:
+            _check_provider(results[0][1])
+            break
+    return hits
+
+def _vector_hits(query_vectors, top_k: int, backend: str, filters: dict = None, hnsw_ef: int = None,
+                 with_vectors: bool = False):
+    """
+    Dense search for each vector; returns lists of (point id, payload, score, vector), best first.
+    `vector` is the stored chunk vector with `with_vectors`, else None.
+    """
+    if backend == "local":
+        return _checked_hits(_local_hits(query_vectors, top_k, filters, with_vectors))
+    client = get_qdrant_client()
+    if len(query_vectors) == 1:
+        return _qdrant_hits([client.search(**_search_kwargs(query_vectors[0], top_k, filters, hnsw_ef, with_vectors))])
+    return _qdrant_hits(client.search_batch(**_search_batch_kwargs(query_vectors, top_k, filters, hnsw_ef, with_vectors)))
+
+async def _avector_hits(query_vectors, top_k: int, backend: str, filters: dict = None, with_vectors: bool = False):
+    if backend == "local":
+        return _checked_hits(_local_hits(query_vectors, top_k, filters, with_vectors))
+    if is_local_mode():
+        # Embedded Qdrant allows one client per storage folder: reuse the sync one off the event loop
+        return await asyncio.to_thread(_vector_hits, query_vectors, top_k, backend, filters, None, with_vectors)
+    client = get_async_qdrant_client()
+    if len(query_vectors) == 1:
+        return _qdrant_hits([await client.search(**_search_kwargs(query_vectors[0], top_k, filters, with_vectors=with_vectors))])
+    return _qdrant_hits(await client.search_batch(**_search_batch_kwargs(query_vectors, top_k, filters, with_vectors=with_vectors)))
+
+def _keyword_hits(query: str, top_k: int, filters: dict = None):
+    """BM25 search over docs_chunks; returns (point id, text) pairs, best first."""
+    predicate = (lambda metadata: payload_matches(metadata, filters)) if filters else None
+    return [(doc_id, text) for doc_id, _, text, _ in get_bm25_index().search(query, top_k, predicate)]
+
+def _candidate_count(top_k: int, mode: str) -> int:
+    if mode not in ("vector", "keyword", "hybrid"):
+        raise ValueError(f"❌ Unknown retrieval mode '{mode}'. Choose from: vector, keyword, hybrid")
+    return top_k if mode == "vector" else max(top_k, HYBRID_CANDIDATES)
+
+def scored_chunk(text: str, score: float = None, vector=None) -> dict:
+    """
+    A retrieved chunk with what the search already knows about it: the similarity `score`
+    to the query and the stored `vector` (both None for chunks only BM25 found).
+    """
+    return {"text": text, "score": score, "vector": None if vector is None else np.asarray(vector, dtype=np.float32)}
+
+def _dense_chunks(hits, scored: bool):
+    texts = payload_texts([payload for _, payload, _, _ in hits])
+    if not scored:
+        return texts
+    return [scored_chunk(text, score, vector) for text, (_, _, score, vector) in zip(texts, hits)]
+
+def _keyword_chunks(keyword_hits, scored: bool):
+    return [scored_chunk(text) if scored else text for _, text in keyword_hits]
+
+def _merge_hits(queries, top_k: int, mode: str, dense, filters: dict = None, scored: bool = False):
+    """Turns dense hits into chunks, fusing them with BM25 hits in hybrid mode."""
+    if mode == "vector":
+        return [_dense_chunks(hits, scored) for hits in dense]
+
+    results = []
+    for query, vector_hits in zip(queries, dense):
+        keyword_hits = _keyword_hits(query, _candidate_count(top_k, mode), filters)
+        chunks = dict(zip([point_id for point_id, _ in keyword_hits], _keyword_chunks(keyword_hits, scored)))
+        chunks.update(zip([hit[0] for hit in vector_hits], _dense_chunks(vector_hits, scored)))
+        fused = reciprocal_rank_fusion(
+            [[hit[0] for hit in vector_hits], [point_id for point_id, _ in keyword_hits]],
+            k=RRF_K,
+        )
+        results.append([chunks[point_id] for point_id in fused[:top_k]])
+    return results
+
+def _retrieve_many(queries, top_k: int, backend: str, filters: dict = None, mode: str = "vector", scored: bool = False):
+    candidates = _candidate_count(top_k, mode)
+    if mode == "keyword":
+        return [_keyword_chunks(_keyword_hits(query, top_k, filters), scored) for query in queries]
+
+    query_vectors = get_query_embeddings(list(queries))
+    dense = _vector_hits(query_vectors, candidates, backend, filters, with_vectors=scored)
+    return _merge_hits(queries, top_k, mode, dense, filters, scored)
+
+async def _aretrieve_many(queries, top_k: int, backend: str, filters: dict = None, mode: str = "vector",
+                          scored: bool = False):
+    candidates = _candidate_count(top_k, mode)
+    if mode == "keyword":
+        return [_keyword_chunks(_keyword_hits(query, top_k, filters), scored) for query in queries]
+
+    query_vectors = await aget_query_embeddings(list(queries))
+    dense = await _avector_hits(query_vectors, candidates, backend, filters, with_vectors=scored)
+    return _merge_hits(queries, top_k, mode, dense, filters, scored)
+
+def _cache_key(query: str, top_k: int, filters: dict, scope, version: str):
+    return (normalize_text(query), top_k, _freeze_filters(filters), scope, version)
+
+def _lookup_cached(queries, top_k: int, backend: str, filters: dict, mode: str, scored: bool = False):
+    """
+    Returns (keys, results, missing indexes) for a batch of queries.
+    Stale hits are returned as-is and refreshed on a background thread.
+    """
+    scope = (backend, mode, "scored") if scored else (backend, mode)
+    version = get_index_version(backend, mode)
+    result_cache.drop_other_versions(scope, version)
+    keys = [_cache_key(query, top_k, filters, scope, version) for query in queries]
+
+    results = [None] * len(queries)
+    missing = []
+    for i, key in enumerate(keys):
+        cached = result_cache.get(key)
+        if cached is None:
+            missing.append(i)
+            continue
+        chunks, stale = cached
+        if stale:
+            result_cache.refresh_async(
+                key, lambda q=queries[i]: _retrieve_many([q], top_k, backend, filters, mode, scored)[0]
+            )
+        results[i] = list(chunks)
+    return keys, results, missing
+
+def _store_results(keys, results, missing, fresh):
+    for i, chunks in zip(missing, fresh):
+        result_cache.put(keys[i], chunks)
+        results[i] = list(chunks)
+    return results
+
+def retrieve_relevant_chunks(query: str, top_k: int = 5, backend: str = None, filters: dict = None, mode: str = None):
+    """
+    Returns the text of the top_k chunks for `query`.
+    `filters` restricts the candidates by payload, e.g.
+    {"source": ["hr_leave_policy", "hr_travel_policy"]} or {"type": "table", "band": "L3"}.
+    `mode` is "vector", "keyword" (BM25 only, no embedding call) or "hybrid".
+    """
+    return retrieve_relevant_chunks_many([query], top_k, backend, filters, mode)[0]
+
+def retrieve_relevant_chunks_many(queries, top_k: int = 5, backend: str = None, filters: dict = None, mode: str = None):
+    """
+    Batched retrieve_relevant_chunks: one embeddings call and one batch search
+    for all uncached queries. Returns a list of chunk-text lists, one per query.
+    """
+    return _retrieve_cached(queries, top_k, backend, filters, mode)
+
+def retrieve_scored_chunks(query: str, top_k: int = 5, backend: str = None, filters: dict = None, mode: str = None):
+    """retrieve_relevant_chunks returning scored_chunk records (text, search score, stored vector)."""
+    return retrieve_scored_chunks_many([query], top_k, backend, filters, mode)[0]
+
+def retrieve_scored_chunks_many(queries, top_k: int = 5, backend: str = None, filters: dict = None, mode: str = None):
+    """Batched retrieve_scored_chunks."""
+    return _retrieve_cached(queries, top_k, backend, filters, mode, scored=True)
+
+def _retrieve_cached(queries, top_k: int, backend: str, filters: dict, mode: str, scored: bool = False):
+    if not queries:
+        return []
+    backend = backend or RETRIEVER_BACKEND
+    mode = mode or RETRIEVAL_MODE
+    keys, results, missing = _lookup_cached(queries, top_k, backend, filters, mode, scored)
+    if missing:
+        fresh = _retrieve_many([queries[i] for i in missing], top_k, backend, filters, mode, scored)
+        _store_results(keys, results, missing, fresh)
+    return results
+
+async def aretrieve_relevant_chunks(query: str, top_k: int = 5, backend: str = None, filters: dict = None, mode: str = None):
+    """Async retrieve_relevant_chunks for FastAPI handlers; uses the shared async clients."""
+    return (await aretrieve_relevant_chunks_many([query], top_k, backend, filters, mode))[0]
+
+async def aretrieve_relevant_chunks_many(queries, top_k: int = 5, backend: str = None, filters: dict = None, mode: str = None):
+    """Async retrieve_relevant_chunks_many."""
+    if not queries:
+        return []
+    backend = backend or RETRIEVER_BACKEND
+    mode = mode or RETRIEVAL_MODE
+    keys, results, missing = _lookup_cached(queries, top_k, backend, filters, mode)
+    if missing:
+        fresh = await _aretrieve_many([queries[i] for i in missing], top_k, backend, filters, mode)
+        _store_results(keys, results, missing, fresh)
+    return results
+
+def check_backend_parity(queries, top_k: int = 5) -> bool:
+    """
+    Runs each query through both backends and compares the returned chunks.
+    Requires a populated Qdrant collection built from the same embedding files.
+    """
+    all_match = True
+    for query in queries:
+        query_vector = get_query_embedding(query)
+        remote = payload_texts([hit.payload for hit in get_qdrant_client().search(**_search_kwargs(query_vector, top_k))])
+        local = payload_texts([payload for _, _, payload in get_local_index().search(query_vector, top_k)])
+
+        if remote == local:
+            print(f"✅ Parity OK: {query}")
+        else:
+            all_match = False
+            print(f"❌ Parity mismatch: {query}")
+            print(f"   qdrant: {[text[:40] for text in remote]}")
+            print(f"   local:  {[text[:40] for text in local]}")
+    return all_match
 
 # 🔁 Test the retriever
 if __name__ == "__main__":
+    if "--parity" in sys.argv:
+        ok = check_backend_parity([
+            "Generate offer letter for Martha Bennett",
+            "Leave entitlements for band L3",
+            "Hotel cap and per diem for international travel",
+            "Work from office policy for Engineering team",
+        ])
+        sys.exit(0 if ok else 1)
+
     query = "Generate offer letter for Martha Bennett"
     print(f"\n🔍 Query: {query}\n")
     chunks = retrieve_relevant_chunks(query)
-    
+
     print("🧠 Retrieved Chunks:")
     for i, chunk in enumerate(chunks, 1):
         print(f"\nChunk #{i}:\n{chunk[:500]}")  # Truncate for readability
+
+    print(f"\n📊 Embedding cache: {embedding_cache.stats()}")
+    print(f"📊 Result cache: {result_cache.stats()}")
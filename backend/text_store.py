@@ -0,0 +1,190 @@
+import os
+import time
+import hashlib
+import logging
+from pathlib import Path
+import numpy as np
+from backend.collection_version import repo_path
+
+# Chunk texts are kept out of Qdrant: each point's payload carries the text's
+# content_hash and the retriever reads the text from this store. The store is a folder
+# of append-only segments, "<n>.bin" (UTF-8 texts back to back) plus "<n>.idx.npy", a
+# key-sorted (key, offset, length) table. Readers memory-map both and binary-search the
+# keys, so a lookup is a slice of the mapped file. Keys are content hashes, so every
+# collection version (see backend/collection_aliases.py) resolves against the same store.
+# Each alias (QDRANT_COLLECTION) gets its own store by default: compaction keeps only the
+# texts that alias's versions reference, so policy sets must not share a folder.
+PAYLOAD_TEXT = os.getenv("QDRANT_PAYLOAD_TEXT", "store")  # "store" or "inline" (text stays in the payload)
+TEXT_STORE_DIR = repo_path(os.getenv("TEXT_STORE_DIR") or Path("data/chunk_text") / os.getenv("QDRANT_COLLECTION", "policy_chunks"))
+MAX_SEGMENTS = int(os.getenv("TEXT_STORE_MAX_SEGMENTS", "8"))  # merged into one beyond this
+INDEX_DTYPE = np.dtype([("key", "S64"), ("offset", "<i8"), ("length", "<i4")])
+INDEX_SUFFIX = ".idx.npy"
+TABLE_PREFIX = "Table data: "
+
+
+def chunk_text(chunk: dict) -> str:
+    """Text a chunk record is embedded, stored and retrieved as (table chunks are prefixed)."""
+    text = chunk.get("text", "")
+    if text.strip() and chunk.get("metadata", {}).get("type", "text") == "table":
+        return f"{TABLE_PREFIX}{text}"  # Or run a table summarization step
+    return text
+
+
+def text_key(text: str) -> str:
+    """Store key of a chunk text: the same SHA-256 as create_embeddings.content_hash."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def stored_payload(payload: dict) -> dict:
+    """Qdrant payload for a chunk with its text left out and referenced by content_hash."""
+    stored = {key: value for key, value in payload.items() if key != "text"}
+    if not stored.get("content_hash"):
+        stored["content_hash"] = text_key(payload.get("text", ""))
+    return stored
+
+
+def _segment_names(folder: Path):
+    # A segment exists once its index is written; data files are renamed into place first
+    return sorted(path.name[:-len(INDEX_SUFFIX)] for path in folder.glob(f"*{INDEX_SUFFIX}"))
+
+
+class TextStore:
+    """Read-only view of a text store folder; newer segments win on duplicate keys."""
+
+    def __init__(self, folder: Path = TEXT_STORE_DIR):
+        self.folder = Path(folder)
+        self.segments = []
+        if not self.folder.exists():
+            return
+        for name in reversed(_segment_names(self.folder)):
+            try:
+                index = np.load(self.folder / f"{name}{INDEX_SUFFIX}", mmap_mode="r")
+                data_path = self.folder / f"{name}.bin"
+                data = np.memmap(data_path, dtype=np.uint8, mode="r") if data_path.stat().st_size else np.empty(0, np.uint8)
+            except FileNotFoundError:
+                continue  # removed by a concurrent compaction, which kept its texts
+            self.segments.append((index, data))
+
+    def __len__(self):
+        return sum(len(index) for index, _ in self.segments)
+
+    def _find(self, key: bytes):
+        for index, data in self.segments:
+            row = int(np.searchsorted(index["key"], key))
+            if row < len(index) and index["key"][row] == key:
+                return data, int(index["offset"][row]), int(index["length"][row])
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key.encode("ascii")) is not None
+
+    def get(self, key: str, default: str = None):
+        found = self._find(key.encode("ascii")) if key else None
+        if found is None:
+            return default
+        data, offset, length = found
+        # Slicing the memory map copies nothing; decoding makes the only copy
+        return bytes(memoryview(data)[offset:offset + length]).decode("utf-8")
+
+    def get_many(self, keys, default: str = ""):
+        return [self.get(key, default) for key in keys]
+
+    def keys(self):
+        for index, _ in self.segments:
+            for key in index["key"]:
+                yield key.decode("ascii")
+
+    def items(self):
+        """Yields (key, text) for every entry, segment by segment."""
+        for index, data in self.segments:
+            for key, offset, length in index:
+                yield key.decode("ascii"), bytes(memoryview(data)[offset:offset + length]).decode("utf-8")
+
+
+class TextStoreWriter:
+    """
+    Writes one new segment. Texts already in the store (or added earlier in this
+    writer) are skipped; close() publishes the segment and compacts the folder
+    once it holds more than MAX_SEGMENTS segments.
+    """
+
+    def __init__(self, folder: Path = TEXT_STORE_DIR, deduplicate: bool = True):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.existing = TextStore(self.folder) if deduplicate else None
+        self.name = f"{time.time_ns():020d}"
+        self.entries = {}  # key -> (offset, length)
+        self.offset = 0
+        self._data = open(self.folder / f"{self.name}.bin.part", "wb")
+
+    def add(self, text: str, key: str = None) -> str:
+        """Stores `text` under `key` (default: its content hash); returns the key."""
+        key = key or text_key(text)
+        if key in self.entries or (self.existing is not None and key in self.existing):
+            return key
+        data = text.encode("utf-8")
+        self._data.write(data)
+        self.entries[key] = (self.offset, len(data))
+        self.offset += len(data)
+        return key
+
+    def close(self):
+        """Publishes the segment; returns the number of texts added."""
+        added = self._publish()
+        if added and len(_segment_names(self.folder)) > MAX_SEGMENTS:
+            compact(self.folder)
+        return added
+
+    def _publish(self):
+        self._data.close()
+        part = self.folder / f"{self.name}.bin.part"
+        if not self.entries:
+            part.unlink(missing_ok=True)
+            return 0
+
+        index = np.array([(key.encode("ascii"), offset, length) for key, (offset, length) in self.entries.items()], dtype=INDEX_DTYPE)
+        index.sort(order="key")
+        os.replace(part, self.folder / f"{self.name}.bin")
+        with open(self.folder / f"{self.name}.idx.part", "wb") as f:
+            np.save(f, index)
+        os.replace(self.folder / f"{self.name}.idx.part", self.folder / f"{self.name}{INDEX_SUFFIX}")
+        logging.info(f"📝 Stored {len(self.entries)} chunk texts ({self.offset // 1024} KB) in {self.folder}")
+        return len(self.entries)
+
+    def discard(self):
+        self._data.close()
+        (self.folder / f"{self.name}.bin.part").unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def compact(folder: Path = TEXT_STORE_DIR, keep_keys=None):
+    """
+    Merges every segment into one. With `keep_keys`, only those texts survive (e.g. the
+    content hashes a collection still references). Returns the number of texts kept.
+    """
+    folder = Path(folder)
+    old = _segment_names(folder)
+    store = TextStore(folder)
+    if len(old) <= 1 and (keep_keys is None or all(key in keep_keys for key in store.keys())):
+        return len(store)  # already one segment with nothing to drop
+
+    writer = TextStoreWriter(folder, deduplicate=False)
+    for key, text in store.items():
+        if keep_keys is None or key in keep_keys:
+            writer.add(text, key)
+    kept = len(writer.entries)
+    # The merged segment is published before the old ones go, so readers always find every text
+    writer._publish()
+    for name in old:
+        (folder / f"{name}{INDEX_SUFFIX}").unlink(missing_ok=True)
+        (folder / f"{name}.bin").unlink(missing_ok=True)
+    logging.info(f"🧹 Compacted {len(old)} text segments into one ({kept} texts)")
+    return kept
@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import shutil
+import logging
+from itertools import islice
+from pathlib import Path
+import numpy as np
+
+# Binary embedding store: one "<name>.npy" matrix (float32, optionally float16) per
+# document plus a "<name>.meta.jsonl" sidecar: a header line, then one {"id", "record"}
+# line per matrix row. np.load(mmap_mode="r") maps the matrix straight from disk and the
+# sidecar is read line by line, so a document can be processed in batches with flat memory.
+META_SUFFIX = ".meta.jsonl"
+LEGACY_META_SUFFIX = ".meta.json"  # single JSON object with "ids" and "records"; still read
+STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+READ_BUFFER_SIZE = 1 << 16  # characters per read when streaming legacy JSON arrays
+
+
+class VectorWriter:
+    """
+    Appends rows to a binary document batch by batch. Rows go to temporary files and
+    close() writes the .npy header and renames both files into place, so readers never
+    see a half-written document and the writer never holds more than one batch.
+    """
+
+    def __init__(self, folder, name: str, dtype: str = STORE_DTYPE):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self.dim = None
+        self._rows = open(self.folder / f"{name}.npy.part", "wb")
+        self._meta = open(self.folder / f"{name}{META_SUFFIX}.part", "w", encoding="utf-8")
+
+    def append(self, ids, vectors, records):
+        matrix = np.asarray(vectors, dtype=self.dtype)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(ids), -1)
+        if self.dim is None:
+            self.dim = int(matrix.shape[1])
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"❌ {self.name}: got {matrix.shape[1]}-dim rows after {self.dim}-dim ones")
+
+        self._rows.write(np.ascontiguousarray(matrix).tobytes())
+        for chunk_id, record in zip(ids, records):
+            self._meta.write(json.dumps({"id": chunk_id, "record": record}, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += len(ids)
+
+    def close(self) -> Path:
+        """Finalises the document; returns the .npy path."""
+        self._rows.close()
+        self._meta.close()
+        rows_path = self.folder / f"{self.name}.npy.part"
+        meta_part = self.folder / f"{self.name}{META_SUFFIX}.part"
+        npy_path = self.folder / f"{self.name}.npy"
+        staged = self.folder / f"{self.name}.npy.tmp"
+        try:
+            with open(staged, "wb") as out, open(rows_path, "rb") as rows:
+                header = {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False,
+                          "shape": (self.count, self.dim or 0)}
+                np.lib.format.write_array_header_1_0(out, header)
+                shutil.copyfileobj(rows, out)
+
+            meta_path = self.folder / f"{self.name}{META_SUFFIX}"
+            with open(meta_part, "r", encoding="utf-8") as lines, open(f"{meta_path}.tmp", "w", encoding="utf-8") as out:
+                out.write(json.dumps({"dtype": self.dtype.name, "count": self.count, "dim": self.dim or 0}) + "\n")
+                shutil.copyfileobj(lines, out)
+
+            os.replace(staged, npy_path)
+            # The sidecar goes last: its presence marks a complete document
+            os.replace(f"{meta_path}.tmp", meta_path)
+            (self.folder / f"{self.name}{LEGACY_META_SUFFIX}").unlink(missing_ok=True)
+        finally:
+            rows_path.unlink(missing_ok=True)
+            meta_part.unlink(missing_ok=True)
+        return npy_path
+
+    def discard(self):
+        """Drops everything appended so far; an existing document of the same name is kept."""
+        self._rows.close()
+        self._meta.close()
+        for suffix in (".npy.part", f"{META_SUFFIX}.part"):
+            (self.folder / f"{self.name}{suffix}").unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def save_vectors(folder, name: str, ids, vectors, records, dtype: str = STORE_DTYPE):
+    """Writes `vectors` as <name>.npy and `ids`/`records` as the sidecar. Returns the .npy path."""
+    with VectorWriter(folder, name, dtype=dtype) as writer:
+        writer.append(ids, vectors, records)
+    return Path(folder) / f"{name}.npy"
+
+
+def remove_vectors(folder, name: str):
+    """Deletes a binary document and its sidecar (either layout)."""
+    folder = Path(folder)
+    for suffix in (".npy", META_SUFFIX, LEGACY_META_SUFFIX):
+        (folder / f"{name}{suffix}").unlink(missing_ok=True)
+
+
+def _iter_sidecar(folder: Path, name: str):
+    """Yields the header, then (id, record) per row, from either sidecar layout."""
+    path = folder / f"{name}{META_SUFFIX}"
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            yield json.loads(f.readline())
+            for line in f:
+                row = json.loads(line)
+                yield row["id"], row["record"]
+        return
+
+    with open(folder / f"{name}{LEGACY_META_SUFFIX}", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    yield {key: meta[key] for key in ("dtype", "count", "dim")}
+    yield from zip(meta["ids"], meta["records"])
+
+
+def _open_binary(folder: Path, name: str, mmap: bool):
+    rows = _iter_sidecar(folder, name)
+    header = next(rows)
+    matrix = np.load(folder / f"{name}.npy", mmap_mode="r" if mmap else None)
+    if matrix.shape[0] != header["count"]:
+        raise ValueError(f"❌ {name}.npy has {matrix.shape[0]} rows but its sidecar lists {header['count']}")
+    return matrix, rows
+
+
+def load_vectors(folder, name: str, mmap: bool = True):
+    """Returns (ids, matrix, records); the matrix is a read-only memory map when `mmap` is set."""
+    matrix, rows = _open_binary(Path(folder), name, mmap)
+    ids, records = [], []
+    for chunk_id, record in rows:
+        ids.append(chunk_id)
+        records.append(record)
+    return ids, matrix, records
+
+
+def iter_json_array(path, buffer_size: int = READ_BUFFER_SIZE):
+    """
+    Yields the elements of a top-level JSON array one at a time, reading the file in
+    `buffer_size` pieces, so only the current element is ever fully parsed in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, pos, eof = "", 0, False
+
+        def fill():
+            # Reads at least as much as is buffered, so an element spanning many reads
+            # is re-parsed a logarithmic number of times
+            nonlocal buffer, pos, eof
+            piece = f.read(max(buffer_size, len(buffer) - pos))
+            eof = not piece
+            buffer = buffer[pos:] + piece
+            pos = 0
+
+        def peek():
+            # Skips whitespace; returns the next character ("" at end of file)
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return buffer[pos] if pos < len(buffer) else ""
+                fill()
+
+        if peek() != "[":
+            raise json.JSONDecodeError("Expected a JSON array", buffer, pos)
+        pos += 1
+        if peek() == "]":
+            return
+        while True:
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                    # A number cut by the end of the buffer ("2.5" of "2.5e3") may continue in the next read
+                    if eof or (end < len(buffer) and (buffer[end] in ",]" or buffer[end].isspace())):
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+            pos = end
+            yield item
+
+            char = peek()
+            if char == "]":
+                return
+            if char != ",":
+                raise json.JSONDecodeError("Expected ',' or ']'", buffer, pos)
+            pos += 1
+            peek()
+
+
+def _split_json_item(item: dict):
+    """Maps either JSON layout to (id, vector, record)."""
+    if "vector" in item:  # qdrant-ready: {id, vector, payload}
+        return item["id"], item["vector"], item["payload"]
+    # raw embeddings: {id, text, embedding, metadata}
+    return item["id"], item["embedding"], {"text": item.get("text", ""), "metadata": item.get("metadata", {})}
+
+
+def _iter_json_document(path):
+    """Streams (id, vector, record) rows of a legacy JSON embedding file, dropping rows without a vector."""
+    for item in iter_json_array(path):
+        chunk_id, vector, record = _split_json_item(item)
+        if vector:
+            yield chunk_id, vector, record
+
+
+def _load_json_document(path):
+    """Parses a legacy JSON embedding file, dropping rows without a vector."""
+    items = list(_iter_json_document(path))
+    if not items:
+        return [], np.empty((0, 0), dtype=np.float32), []
+    ids, vectors, records = zip(*items)
+    return list(ids), np.asarray(vectors, dtype=np.float32), list(records)
+
+
+def list_documents(folder):
+    """Document names in `folder`; a binary .npy document shadows a legacy JSON file of the same name."""
+    folder = Path(folder)
+    names = {path.stem for path in folder.glob("*.npy")}
+    names.update(
+        path.stem for path in folder.glob("*.json") if not path.name.endswith(LEGACY_META_SUFFIX)
+    )
+    return sorted(names)
+
+
+def load_document(folder, name: str, mmap: bool = True):
+    """
+    Returns (ids, matrix, records) for one document.
+    Binary documents are memory-mapped; legacy JSON files are parsed into float32.
+    """
+    folder = Path(folder)
+    if (folder / f"{name}.npy").exists():
+        return load_vectors(folder, name, mmap=mmap)
+
+    return _load_json_document(folder / f"{name}.json")
+
+
+def iter_batches(folder, name: str, batch_size: int):
+    """
+    Yields (ids, matrix, records) batches of at most `batch_size` rows for one document,
+    reading the sidecar (or a legacy JSON file) incrementally. Binary matrices are memory-mapped
+    slices; legacy JSON batches are parsed into float32.
+    """
+    folder = Path(folder)
+    if (folder / f"{name}.npy").exists():
+        matrix, rows = _open_binary(folder, name, mmap=True)
+        offset = 0
+        while batch := list(islice(rows, batch_size)):
+            ids, records = zip(*batch)
+            yield list(ids), matrix[offset:offset + len(batch)], list(records)
+            offset += len(batch)
+        return
+
+    rows = _iter_json_document(folder / f"{name}.json")
+    while batch := list(islice(rows, batch_size)):
+        ids, vectors, records = zip(*batch)
+        yield list(ids), np.asarray(vectors, dtype=np.float32), list(records)
+
+
+def iter_documents(folder, mmap: bool = True):
+    """Yields (name, ids, matrix, records) for every non-empty document in `folder`."""
+    for name in list_documents(folder):
+        ids, matrix, records = load_document(folder, name, mmap=mmap)
+        if ids:
+            yield name, ids, matrix, records
+
+
+def convert_json_folder(folder, dtype: str = STORE_DTYPE, remove_json: bool = False, batch_size: int = 256):
+    """Converts every legacy JSON embedding file in `folder` to the binary format, streaming each file."""
+    folder = Path(folder)
+    converted = 0
+    for path in sorted(folder.glob("*.json")):
+        if path.name.endswith(LEGACY_META_SUFFIX):
+            continue
+        writer = VectorWriter(folder, path.stem, dtype=dtype)
+        try:
+            for ids, vectors, records in iter_batches(folder, path.stem, batch_size):
+                writer.append(ids, vectors, records)
+        except Exception:
+            writer.discard()
+            raise
+        if not writer.count:
+            writer.discard()
+            logging.warning(f"⚠️ No vectors in {path.name}, skipping.")
+            continue
+
+        npy_path = writer.close()
+        logging.info(f"✅ {path.name} ({path.stat().st_size // 1024} KB) -> {npy_path.name} ({npy_path.stat().st_size // 1024} KB, {dtype})")
+        if remove_json:
+            path.unlink()
+        converted += 1
+    return converted
+
+
+if __name__ == "__main__":
+    # python -m backend.vector_store data/embeddings data/qdrant_ready_embeddings [--float16] [--remove-json]
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    folders = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    dtype = "float16" if "--float16" in sys.argv else STORE_DTYPE
+    for folder in folders:
+        convert_json_folder(folder, dtype=dtype, remove_json="--remove-json" in sys.argv)
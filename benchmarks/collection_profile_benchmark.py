@@ -0,0 +1,187 @@
+"""
+Collection profile benchmark: estimated and measured memory, search latency and
+recall against exact float search for each QDRANT_PROFILE layout.
+
+Each profile gets a scratch collection "<collection>__profile_<name>" filled with
+the local-index vectors (optionally replicated with small jitter via --scale to
+mimic a larger policy library), searched with the query set from
+retrieval_benchmark, and dropped afterwards (unless --keep). RAM and disk usage
+are read from the server's telemetry (summed over the collection's segments)
+after the searches, next to the estimate from collection_profiles.
+Run against a Qdrant server: embedded mode (QDRANT_PATH) ignores quantization
+and on-disk settings, so its numbers only check the plumbing.
+
+    python -m benchmarks.collection_profile_benchmark --scale 50 --out data/benchmarks/profiles.json
+"""
+import json
+import time
+import uuid
+import argparse
+import platform
+from pathlib import Path
+import httpx
+import numpy as np
+from qdrant_client.http.models import PointStruct, SearchParams, CollectionStatus
+from backend import retriever
+from backend.collection_profiles import PROFILES, collection_config, quantization_search_params, estimate_memory_bytes
+from backend.qdrant_connection import is_local_mode, QDRANT_URL
+from backend.vector_store import iter_documents
+from benchmarks.retrieval_benchmark import build_query_set, percentile
+
+UPSERT_BATCH = 256
+# Per-segment RAM/disk usage is only included in detailed telemetry
+TELEMETRY_DETAILS_LEVEL = 4
+
+
+def load_points(folder, scale: int, seed: int = 0):
+    """Returns (point ids, float32 unit vectors, payloads); copies beyond the first are jittered."""
+    ids, segments, payloads = [], [], []
+    for _, doc_ids, matrix, records in iter_documents(folder):
+        ids.extend(retriever.chunk_point_id(chunk_id) for chunk_id in doc_ids)
+        segments.append(np.asarray(matrix, dtype=np.float32))
+        payloads.extend(records)
+    if not segments:
+        raise FileNotFoundError(f"📁 No embedding files found in {folder}")
+
+    base = np.concatenate(segments)
+    base /= np.maximum(np.linalg.norm(base, axis=1, keepdims=True), 1e-12)
+    rng = np.random.default_rng(seed)
+    vectors, all_ids, all_payloads = [base], list(ids), list(payloads)
+    for copy in range(1, scale):
+        noisy = base + rng.normal(scale=0.02, size=base.shape).astype(np.float32)
+        vectors.append(noisy / np.linalg.norm(noisy, axis=1, keepdims=True))
+        all_ids.extend(str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{point_id}:{copy}")) for point_id in ids)
+        all_payloads.extend(payloads)
+    return all_ids, np.concatenate(vectors), all_payloads
+
+
+def fill_collection(client, name, profile, ids, vectors, payloads):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(collection_name=name, **collection_config(vectors.shape[1], profile))
+    start = time.perf_counter()
+    for i in range(0, len(ids), UPSERT_BATCH):
+        client.upsert(
+            collection_name=name,
+            points=[
+                PointStruct(id=point_id, vector=vector.tolist(), payload=payload)
+                for point_id, vector, payload in zip(ids[i:i + UPSERT_BATCH], vectors[i:i + UPSERT_BATCH], payloads[i:i + UPSERT_BATCH])
+            ],
+            wait=True,
+        )
+    # Indexing and quantization run in the background; time until the collection settles
+    while client.get_collection(name).status != CollectionStatus.GREEN:
+        time.sleep(0.2)
+    return time.perf_counter() - start
+
+
+def measure_usage(name: str):
+    """(RAM bytes, disk bytes) of a collection's local segments per server telemetry; (None, None) if unavailable."""
+    if is_local_mode():
+        return None, None
+    response = httpx.get(f"{QDRANT_URL}/telemetry", params={"details_level": TELEMETRY_DETAILS_LEVEL}, timeout=30)
+    response.raise_for_status()
+    collections = response.json()["result"].get("collections", {}).get("collections", [])
+    ram = disk = None
+    for collection in collections:
+        if collection.get("id") != name:
+            continue
+        ram = disk = 0
+        for shard in collection.get("shards") or []:
+            for segment in (shard.get("local") or {}).get("segments") or []:
+                info = segment.get("info", {})
+                ram += info.get("ram_usage_bytes", 0)
+                disk += info.get("disk_usage_bytes", 0)
+    return ram, disk
+
+
+def to_mb(value):
+    return None if value is None else round(value / 2**20, 2)
+
+
+def run_profile(client, profile, ids, vectors, payloads, query_vectors, exact, top_k, hnsw_ef, repeats, keep):
+    name = f"{retriever.COLLECTION_NAME}__profile_{profile}"
+    build_s = fill_collection(client, name, profile, ids, vectors, payloads)
+    params = SearchParams(hnsw_ef=hnsw_ef, quantization=quantization_search_params(profile))
+
+    latencies, recalls = [], []
+    for query_vector, expected in zip(query_vectors, exact):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            hits = client.search(collection_name=name, query_vector=query_vector.tolist(), limit=top_k, search_params=params)
+            latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({str(hit.id) for hit in hits} & expected) / len(expected))
+
+    ram_bytes, disk_bytes = measure_usage(name)
+    if not keep:
+        client.delete_collection(name)
+
+    return {
+        "profile": profile,
+        **PROFILES[profile],
+        "points": len(ids),
+        "dims": int(vectors.shape[1]),
+        "top_k": top_k,
+        "hnsw_ef": hnsw_ef,
+        "est_resident_mb": to_mb(estimate_memory_bytes(len(ids), vectors.shape[1], profile)),
+        "ram_mb": to_mb(ram_bytes),
+        "disk_mb": to_mb(disk_bytes),
+        "recall_vs_exact": round(float(np.mean(recalls)), 4),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "build_s": round(build_s, 2),
+    }
+
+
+def run_benchmark(profiles, scale: int, top_k: int, hnsw_ef: int, repeats: int, keep: bool):
+    if is_local_mode():
+        print("⚠️ Embedded mode ignores quantization and on-disk settings; point QDRANT_URL at a server for real numbers.")
+
+    ids, vectors, payloads = load_points(retriever.LOCAL_INDEX_DIR, scale)
+    query_set = build_query_set()
+    query_vectors = np.asarray(retriever.get_query_embeddings([query for query, _ in query_set]), dtype=np.float32)
+    query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+
+    # Exact float top-k is the reference every profile is measured against
+    k = min(top_k, len(ids))
+    scores = query_vectors @ vectors.T
+    exact = [{ids[i] for i in np.argpartition(-row, k - 1)[:k]} for row in scores]
+
+    client = retriever.get_qdrant_client()
+    results = []
+    for profile in profiles:
+        row = run_profile(client, profile, ids, vectors, payloads, query_vectors, exact, k, hnsw_ef, repeats, keep)
+        results.append(row)
+        measured = "n/a" if row["ram_mb"] is None else f"{row['ram_mb']}MB/{row['disk_mb']}MB"
+        print(f"{profile:>8}  points={row['points']}  est_ram={row['est_resident_mb']}MB  ram/disk={measured}  recall={row['recall_vs_exact']:.3f}  "
+              f"p50={row['p50_ms']}ms  p95={row['p95_ms']}ms  build={row['build_s']}s")
+
+    return {
+        "embedding_provider": retriever.get_embedding_provider().name,
+        "qdrant": "embedded" if is_local_mode() else "server",
+        "scale": scale,
+        "queries": len(query_set),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare memory, latency and recall across Qdrant collection profiles.")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--scale", type=int, default=1, help="copies of the corpus to index (jittered)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--ef", type=int, default=retriever.HNSW_EF)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch collections")
+    parser.add_argument("--out", default="data/benchmarks/profiles.json")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.profiles, args.scale, args.top_k, args.ef, args.repeats, args.keep)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📊 Wrote {len(report['results'])} rows to {out}")
@@ -0,0 +1,122 @@
+"""
+Reduced-dimension recall report: how much retrieval quality EMBEDDING_DIMS=256/512
+gives up against full 1536-dim vectors, and what it saves in memory and search time.
+
+Full-size chunk vectors are read from --index-dir (the local-index folder by default),
+truncated and renormalised to each size exactly as ingestion does, and searched
+exactly. recall@k uses the section-title query set from retrieval_benchmark;
+overlap@k is the share of the full-size top-k that the reduced vectors also return.
+
+    python -m benchmarks.dimension_benchmark --out data/benchmarks/dimensions.json
+"""
+import json
+import time
+import argparse
+import platform
+from pathlib import Path
+import numpy as np
+from backend import retriever
+from backend.embeddings import EMBEDDING_DIM, SUPPORTED_DIMS, get_embedding_provider, reduce_dimensions
+from backend.vector_store import iter_documents
+from benchmarks.retrieval_benchmark import build_query_set, percentile
+
+DEFAULT_TOP_KS = [1, 3, 5, 10]
+
+
+def load_full_vectors(folder):
+    """Returns (point ids, float32 matrix) for every chunk; the vectors must be full size."""
+    ids, segments = [], []
+    for name, doc_ids, matrix, _ in iter_documents(folder):
+        if matrix.shape[1] != EMBEDDING_DIM:
+            raise ValueError(f"❌ {name} holds {matrix.shape[1]}-dim vectors; the report needs {EMBEDDING_DIM}-dim originals")
+        ids.extend(retriever.chunk_point_id(chunk_id) for chunk_id in doc_ids)
+        segments.append(np.asarray(matrix, dtype=np.float32))
+    if not segments:
+        raise FileNotFoundError(f"📁 No embedding files found in {folder}")
+    return ids, np.concatenate(segments)
+
+
+def embed_queries(queries):
+    """Full-size query vectors, through the retriever's embedding cache."""
+    provider = get_embedding_provider(dims=EMBEDDING_DIM)
+    embeddings, missing = retriever._cached_embeddings(provider, queries)
+    if missing:
+        retriever._store_embeddings(provider, queries, embeddings, missing, provider.embed([queries[i] for i in missing]))
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def top_ids(doc_matrix, query_vector, ids, k):
+    scores = doc_matrix @ query_vector
+    top = np.argpartition(-scores, k - 1)[:k]
+    return [ids[i] for i in top[np.argsort(-scores[top], kind="stable")]]
+
+
+def run_report(index_dir, dims_list, top_ks, repeats: int = 5):
+    query_set = build_query_set()
+    ids, full_docs = load_full_vectors(index_dir)
+    full_queries = embed_queries([query for query, _ in query_set])
+    max_k = min(max(top_ks), len(ids))
+
+    # Full size is always computed: it is the reference for overlap@k
+    reduced = {
+        dims: (reduce_dimensions(full_docs, dims), reduce_dimensions(full_queries, dims))
+        for dims in set(dims_list) | {EMBEDDING_DIM}
+    }
+    baseline_docs, baseline_queries = reduced[EMBEDDING_DIM]
+    baseline = [top_ids(baseline_docs, query_vector, ids, max_k) for query_vector in baseline_queries]
+
+    results = []
+    for dims in dims_list:
+        docs, queries = reduced[dims]
+        latencies, ranked = [], []
+        for query_vector in queries:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                hits = top_ids(docs, query_vector, ids, max_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+            ranked.append(hits)
+
+        for top_k in top_ks:
+            k = min(top_k, max_k)
+            recall = [len(set(hits[:k]) & relevant) / len(relevant) for hits, (_, relevant) in zip(ranked, query_set)]
+            overlap = [len(set(hits[:k]) & set(full[:k])) / k for hits, full in zip(ranked, baseline)]
+            row = {
+                "dims": dims,
+                "top_k": top_k,
+                "queries": len(query_set),
+                "recall_at_k": round(float(np.mean(recall)), 4),
+                "overlap_with_full_at_k": round(float(np.mean(overlap)), 4),
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "index_mb": round(docs.nbytes / 2**20, 3),
+            }
+            results.append(row)
+            print(f"dims={dims:>4} k={top_k:>2}  recall={row['recall_at_k']:.3f}  overlap={row['overlap_with_full_at_k']:.3f}  "
+                  f"p50={row['p50_ms']}ms  index={row['index_mb']}MB")
+
+    return {
+        "embedding_provider": get_embedding_provider(dims=EMBEDDING_DIM).name,
+        "index_dir": str(index_dir),
+        "chunks": len(ids),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare recall/latency/size of reduced-dimension embeddings.")
+    parser.add_argument("--index-dir", default=str(retriever.LOCAL_INDEX_DIR))
+    parser.add_argument("--dims", nargs="+", type=int, default=list(SUPPORTED_DIMS), choices=SUPPORTED_DIMS)
+    parser.add_argument("--top-k", nargs="+", type=int, default=DEFAULT_TOP_KS)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--out", default="data/benchmarks/dimensions.json")
+    args = parser.parse_args()
+
+    report = run_report(Path(args.index_dir), args.dims, args.top_k, args.repeats)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📊 Wrote {len(report['results'])} rows to {out}")
@@ -0,0 +1,93 @@
+"""
+PDF extraction benchmark: wall time and chunk parity of the pypdf text-layer path
+against the unstructured partitioner, per policy PDF (see backend/ingest/chunks.py).
+
+Both paths run through the same chunk_elements() sectioning, so parity is measured
+on the final chunk records:
+  - title_recall: share of the unstructured section titles the text path also produces
+  - text_similarity: word-sequence similarity of the concatenated chunk texts (0-1)
+  - table_chunks: table chunks found by each path
+"auto" reports which path PDF_EXTRACTION=auto would take for the document, and why.
+
+    python -m benchmarks.extraction_benchmark --pdf-dir data/raw_pdfs --out data/benchmarks/extraction.json
+"""
+import json
+import time
+import difflib
+import argparse
+import platform
+from pathlib import Path
+import numpy as np
+from backend.ingest.chunks import build_chunks, discover_documents, read_text_layer, needs_unstructured
+
+
+def timed_chunks(doc_name, path, extraction, repeats):
+    """Returns (chunks, per-run wall times in ms)."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = build_chunks(doc_name, path, extraction)
+        times.append((time.perf_counter() - start) * 1000)
+    return chunks, times
+
+
+def parity(reference, candidate):
+    ref_titles = {chunk["metadata"]["section_title"] for chunk in reference}
+    titles = {chunk["metadata"]["section_title"] for chunk in candidate}
+    ref_words = " ".join(chunk["text"] for chunk in reference).split()
+    words = " ".join(chunk["text"] for chunk in candidate).split()
+    return {
+        "title_recall": round(len(ref_titles & titles) / len(ref_titles), 4) if ref_titles else None,
+        "text_similarity": round(difflib.SequenceMatcher(None, ref_words, words, autojunk=False).ratio(), 4),
+    }
+
+
+def run_benchmark(pdf_dir: Path, repeats: int):
+    rows = []
+    for doc_name, path in discover_documents(pdf_dir).items():
+        pages, has_images = read_text_layer(path)
+        reason = needs_unstructured(pages, has_images)
+        reference, unstructured_ms = timed_chunks(doc_name, path, "unstructured", repeats)
+        chunks, text_ms = timed_chunks(doc_name, path, "text", repeats)
+
+        row = {
+            "document": doc_name,
+            "pages": len(pages),
+            "auto": "unstructured" if reason else "text",
+            "auto_reason": reason,
+            "unstructured_ms": round(float(np.median(unstructured_ms)), 1),
+            "text_ms": round(float(np.median(text_ms)), 1),
+            "speedup": round(float(np.median(unstructured_ms) / np.median(text_ms)), 1),
+            "chunks": {"unstructured": len(reference), "text": len(chunks)},
+            "table_chunks": {
+                "unstructured": sum(chunk["metadata"]["type"] == "table" for chunk in reference),
+                "text": sum(chunk["metadata"]["type"] == "table" for chunk in chunks),
+            },
+            **parity(reference, chunks),
+        }
+        rows.append(row)
+        print(f"{doc_name:>24}  unstructured={row['unstructured_ms']}ms  text={row['text_ms']}ms  x{row['speedup']}  "
+              f"chunks={len(reference)}/{len(chunks)}  titles={row['title_recall']}  similarity={row['text_similarity']}  "
+              f"auto={row['auto']}")
+
+    return {
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeats": repeats,
+        "results": rows,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare pypdf text-layer extraction with unstructured partitioning.")
+    parser.add_argument("--pdf-dir", type=Path, default=Path("data/raw_pdfs"))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--out", default="data/benchmarks/extraction.json")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.pdf_dir, args.repeats)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n📊 Wrote {len(report['results'])} rows to {out}")
@@ -0,0 +1,119 @@
+"""
+Retrieval benchmark: recall@k, p50/p95 search latency and prompt-token size
+for a sweep of hnsw_ef, top_k and backend (Qdrant vs local).
+
+The labelled query set comes from data/docs_chunks: each section title is a
+query and the chunks carrying that title are its relevant set.
+
+    python -m benchmarks.retrieval_benchmark --out data/benchmarks/retrieval.json
+"""
+import re
+import json
+import time
+import argparse
+import platform
+from pathlib import Path
+from collections import defaultdict
+import numpy as np
+from backend import retriever
+from backend.tokens import count_tokens
+
+DEFAULT_EFS = [16, 32, 64, 128, 256]
+DEFAULT_TOP_KS = [1, 3, 5, 8, 10]
+TITLE_PREFIX_RE = re.compile(r"^[^\w]*(\d+(\.\d+)*\.?)?\s*")
+
+
+def build_query_set(chunks_dir: Path = retriever.BM25_CHUNKS_DIR):
+    """Returns [(query, {relevant point ids})] built from section titles."""
+    relevant = defaultdict(set)
+    for filepath in sorted(Path(chunks_dir).glob("*.json")):
+        with open(filepath, "r", encoding="utf-8") as f:
+            for chunk in json.load(f):
+                title = chunk.get("metadata", {}).get("section_title", "")
+                query = TITLE_PREFIX_RE.sub("", title).strip()
+                if not query or query == "Untitled Section" or not chunk.get("text", "").strip():
+                    continue
+                relevant[query].add(retriever.chunk_point_id(chunk["id"]))
+    return sorted(relevant.items())
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+def qdrant_available() -> bool:
+    try:
+        retriever.get_qdrant_client().get_collection(retriever.COLLECTION_NAME)
+        return True
+    except Exception as e:
+        print(f"⚠️ Qdrant unavailable, skipping its runs: {e}")
+        return False
+
+
+def run_config(query_set, query_vectors, backend, top_k, hnsw_ef, repeats):
+    recalls, latencies, tokens = [], [], []
+    for (query, relevant), vector in zip(query_set, query_vectors):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            hits = retriever._vector_hits([vector], top_k, backend, hnsw_ef=hnsw_ef)[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        found = {point_id for point_id, _, _, _ in hits}
+        recalls.append(len(found & relevant) / len(relevant))
+        tokens.append(count_tokens("\n\n".join(retriever.payload_texts([payload for _, payload, _, _ in hits]))))
+
+    return {
+        "backend": backend,
+        "hnsw_ef": hnsw_ef,
+        "top_k": top_k,
+        "queries": len(query_set),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "mean_prompt_tokens": round(float(np.mean(tokens)), 1),
+    }
+
+
+def run_benchmark(backends, efs, top_ks, repeats: int = 5):
+    query_set = build_query_set()
+    # Embeddings are computed (or served from the cache) once, so timings cover search only
+    query_vectors = retriever.get_query_embeddings([query for query, _ in query_set])
+
+    results = []
+    for backend in backends:
+        if backend == "qdrant" and not qdrant_available():
+            continue
+        # The local backend is exact search; hnsw_ef does not apply
+        for hnsw_ef in (efs if backend == "qdrant" else [None]):
+            for top_k in top_ks:
+                row = run_config(query_set, query_vectors, backend, top_k, hnsw_ef, repeats)
+                results.append(row)
+                print(f"{backend:>6} ef={str(hnsw_ef):>4} k={top_k:>2}  recall={row['recall_at_k']:.3f}  "
+                      f"p50={row['p50_ms']}ms  p95={row['p95_ms']}ms  tokens={row['mean_prompt_tokens']}")
+
+    return {
+        "embedding_provider": retriever.get_embedding_provider().name,
+        "collection": retriever.COLLECTION_NAME,
+        "local_index_dir": str(retriever.LOCAL_INDEX_DIR),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep retrieval settings and report recall/latency/tokens.")
+    parser.add_argument("--backends", nargs="+", default=["qdrant", "local"])
+    parser.add_argument("--ef", nargs="+", type=int, default=DEFAULT_EFS)
+    parser.add_argument("--top-k", nargs="+", type=int, default=DEFAULT_TOP_KS)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--out", default="data/benchmarks/retrieval.json")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.backends, args.ef, args.top_k, args.repeats)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📊 Wrote {len(report['results'])} rows to {out}")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make the repo root importable however pytest is invoked
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,62 @@
+import importlib
+import pytest
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+QUERIES = [
+    "How many days of annual leave do employees get?",
+    "hotel cap per diem for business travel",
+    "notice period and probation terms",
+]
+FILTERS = [
+    None,
+    {"source": "hr_leave_policy"},
+    {"band": "L3"},
+    {"source": ["hr_leave_policy", "hr_travel_policy"], "type": "text"},
+]
+
+
+@pytest.fixture(scope="module")
+def retriever(tmp_path_factory):
+    """
+    The retriever configured offline: hashing embeddings and an embedded Qdrant collection
+    built from data/qdrant_ready_embeddings, the same files the local backend reads.
+    """
+    tmp = tmp_path_factory.mktemp("parity")
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv("EMBEDDING_PROVIDER", "hashing")
+        env.setenv("QDRANT_PATH", str(tmp / "qdrant"))
+        env.setenv("QDRANT_COLLECTION", "policy_chunks_parity")
+        env.setenv("EMBEDDING_CACHE_PATH", str(tmp / "embedding_cache.sqlite3"))
+        env.setenv("COLLECTION_VERSION_FILE", str(tmp / "collection_version.json"))
+        env.setenv("RETRIEVAL_MODE", "vector")
+        env.delenv("LOCAL_INDEX_DIR", raising=False)
+        env.delenv("EMBEDDING_DIMS", raising=False)
+
+        # Settings are read at import time
+        from backend import collection_version, qdrant_connection, embeddings, retriever
+        for module in (collection_version, qdrant_connection, embeddings, retriever):
+            importlib.reload(module)
+
+        client = retriever.get_qdrant_client()
+        points = []
+        for _, ids, matrix, records in retriever.iter_documents(retriever.LOCAL_INDEX_DIR):
+            points.extend(
+                PointStruct(id=retriever.chunk_point_id(chunk_id), vector=vector.tolist(), payload=record)
+                for chunk_id, vector, record in zip(ids, matrix, records)
+            )
+        client.create_collection(
+            retriever.COLLECTION_NAME,
+            vectors_config=VectorParams(size=len(points[0].vector), distance=Distance.COSINE),
+        )
+        client.upsert(retriever.COLLECTION_NAME, points=points, wait=True)
+        yield retriever
+        client.close()
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("query", QUERIES)
+def test_local_backend_matches_qdrant(retriever, query, filters):
+    local = retriever.retrieve_relevant_chunks(query, top_k=5, backend="local", filters=filters)
+    remote = retriever.retrieve_relevant_chunks(query, top_k=5, backend="qdrant", filters=filters)
+    assert local
+    assert local == remote
@@ -1,8 +1,15 @@
 import os
-import json
+import sys
 import logging
+from pathlib import Path
+import numpy as np
 from tqdm import tqdm
 
+# Make the repo root importable when run as a script from data/
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from backend.vector_store import list_documents, iter_batches, VectorWriter
+from backend.embeddings import get_embedding_dims, reduce_dimensions, reduced_name
+
 # --- Logging Setup ---
 logging.basicConfig(
     level=logging.INFO,
@@ -11,43 +18,68 @@ logging.basicConfig(
 )
 
 # --- Directories ---
-INPUT_DIR = "embeddings"  # Folder with raw embedding JSON files
+INPUT_DIR = "embeddings"  # Folder with raw embeddings (.npy + sidecar, or legacy JSON)
 OUTPUT_DIR = "qdrant_ready_embeddings"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# --- Target vector size (EMBEDDING_DIMS); full-size embeddings are truncated and renormalised ---
+DIMS = get_embedding_dims()
+
+# --- Rows per read/write batch ---
+BATCH_SIZE = int(os.getenv("TRANSFORM_BATCH_SIZE", "256"))
+
 # --- Transformation Process ---
-for filename in os.listdir(INPUT_DIR):
-    if filename.endswith(".json"):
-        filepath = os.path.join(INPUT_DIR, filename)
-        try:
-            with open(filepath, "r") as f:
-                data = json.load(f)
-        except Exception as e:
-            logging.error(f"❌ Failed to read {filename}: {e}")
-            continue
-
-        formatted_points = []
-        for item in tqdm(data, desc=f"Processing {filename}"):
-            if not item.get("embedding") or not isinstance(item["embedding"], list):
-                logging.warning(f"⚠️ Skipping invalid embedding for ID: {item.get('id')}")
-                continue
-
-            payload = {
-                "text": item.get("text", ""),
-                **item.get("metadata", {})
-            }
-
-            formatted = {
-                "id": item["id"],
-                "vector": item["embedding"],
-                "payload": payload
-            }
-            formatted_points.append(formatted)
-
-        try:
-            out_path = os.path.join(OUTPUT_DIR, filename)
-            with open(out_path, "w") as out_f:
-                json.dump(formatted_points, out_f, indent=2)
-            logging.info(f"✅ Transformed and saved: {filename}")
-        except Exception as e:
-            logging.error(f"❌ Failed to save {filename}: {e}")
+# Reads <name>.npy + sidecar (or legacy JSON) from embeddings/ and writes the same
+# binary layout with Qdrant payloads. Rows are streamed in batches of BATCH_SIZE: each
+# batch is validated, reduced and appended to the output, so memory stays flat however
+# large a document is, and the matrix is never converted to Python floats.
+for name in list_documents(INPUT_DIR):
+    writer = None
+    try:
+        with tqdm(desc=f"Processing {name}", unit="chunks") as progress:
+            for ids, vectors, records in iter_batches(INPUT_DIR, name, BATCH_SIZE):
+                if writer is None:
+                    if vectors.shape[1] < DIMS:
+                        raise ValueError(f"{vectors.shape[1]}-dim embeddings, fewer than EMBEDDING_DIMS={DIMS}; re-embed it")
+                    reduce = vectors.shape[1] > DIMS
+                    # Keeps the input precision (float16 stays float16)
+                    writer = VectorWriter(OUTPUT_DIR, name, dtype=str(vectors.dtype))
+
+                keep, payloads = [], []
+                for row, (chunk_id, record) in enumerate(zip(ids, records)):
+                    if not chunk_id or not np.isfinite(vectors[row]).all():
+                        logging.warning(f"⚠️ Skipping invalid embedding for ID: {chunk_id}")
+                        continue
+
+                    keep.append(row)
+                    payload = {
+                        "text": record.get("text", ""),
+                        **record.get("metadata", {})
+                    }
+                    if reduce and "embedding_provider" in payload:
+                        payload["embedding_provider"] = reduced_name(payload["embedding_provider"], DIMS)
+                    payloads.append(payload)
+                progress.update(len(ids))
+
+                if keep:
+                    matrix = vectors if len(keep) == len(ids) else vectors[keep]
+                    if reduce:
+                        matrix = reduce_dimensions(matrix, DIMS)
+                    writer.append([ids[row] for row in keep], matrix, payloads)
+    except Exception as e:
+        if writer is not None:
+            writer.discard()
+        logging.error(f"❌ Failed to transform {name}: {e}")
+        continue
+
+    if writer is None or not writer.count:
+        if writer is not None:
+            writer.discard()
+        logging.warning(f"⚠️ No valid embeddings in {name}, skipping.")
+        continue
+
+    try:
+        writer.close()
+        logging.info(f"✅ Transformed and saved: {name} ({writer.count} vectors, {writer.dim} dims)")
+    except Exception as e:
+        logging.error(f"❌ Failed to save {name}: {e}")